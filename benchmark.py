@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput of the html parsers over the raw-html corpus, and of
+the CSV loaders over a CSV file of games.
+
+Every configuration runs in its own process, so that the peak RSS reported for
+it is not inflated by the ones that ran before. The results are written as
+JSON and can be compared against a stored baseline, taken on the same sample
+of pages and the same CSV file:
+
+    ./benchmark.py --output baseline.json
+    ./benchmark.py --baseline baseline.json --threshold 0.2
+
+benchmark-baseline.json is the baseline of the default sample (every 25th page
+of raw-html, and past.csv). Throughput depends on the machine: take a new one
+with --output before comparing runs on another machine.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bs4
+
+import past
+from game import Game
+from nvl import HtmlGameParser
+
+# ways of loading a CSV file of games: row by row, or with the bulk loader
+CSV_LOADERS = ["from_csv", "read_csv"]
+
+
+def sample_files(directory, every):
+    """Take every n-th page of the corpus, always in the same order"""
+    files = sorted(glob.glob(os.path.join(directory, "*.html")))
+    return files[every - 1 :: every] if every > 1 else files
+
+
+def run_nvl(files, backend, prescan):
+    parser = HtmlGameParser(backend=backend, prescan=prescan)
+    games = 0
+    for f in files:
+        parsed, discarded = parser.parse_file(f)
+        games += len(parsed) + discarded
+    return games
+
+
+def run_past(files):
+    games = 0
+    for f in files:
+        soup = bs4.BeautifulSoup(past.load_file(f), features="html.parser")
+        raw_games = soup.find_all("div", attrs={"class": "col-12 mb-4 resultContents"})
+        games += len(past.parse_results(raw_games, "unknown", "unknown", "unknown"))
+    return games
+
+
+def run_csv(filename, loader):
+    with open(filename, "r", newline="") as csv_file:
+        if loader == "from_csv":
+            games = [Game.from_csv(g) for g in csv.DictReader(csv_file)]
+        else:
+            games = list(Game.read_csv(csv_file))
+    return len(games)
+
+
+def measure(name, files):
+    """Run one configuration. Meant to be called in a fresh process"""
+    logging.getLogger().setLevel(logging.ERROR)  # don't time the warnings
+    start = time.perf_counter()
+    if name == "past":
+        games = run_past(files)
+    elif name in CSV_LOADERS:
+        games = run_csv(files[0], name)
+    else:
+        backend, _, mode = name.partition("+")
+        games = run_nvl(files, backend, prescan=mode == "prescan")
+    elapsed = time.perf_counter() - start
+
+    megabytes = sum(os.path.getsize(f) for f in files) / 1024**2
+    return {
+        "name": name,
+        "pages": len(files),
+        "games": games,
+        "megabytes": round(megabytes, 2),
+        "seconds": round(elapsed, 3),
+        "pages_per_second": round(len(files) / elapsed, 3),
+        "games_per_second": round(games / elapsed, 3),
+        "megabytes_per_second": round(megabytes / elapsed, 3),
+        # kilobytes on linux, bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            / (1024**2 if sys.platform == "darwin" else 1024),
+            1,
+        ),
+    }
+
+
+# settings that must be the same for two runs to be compared
+SAMPLE = ["corpus", "every", "csv"]
+
+
+def sample_differences(baseline, sample):
+    """Settings of SAMPLE that differ between the baseline and 'sample'"""
+    return [
+        f"{name} {baseline.get(name)!r} in the baseline, {sample[name]!r} now"
+        for name in SAMPLE
+        if baseline.get(name) != sample[name]
+    ]
+
+
+def compare(results, baseline, threshold):
+    """
+    Return the names of the configurations whose throughput dropped by more
+    than 'threshold' (a fraction) against the baseline
+    """
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        if r["name"] not in previous:
+            continue
+        before = previous[r["name"]]["megabytes_per_second"]
+        change = (r["megabytes_per_second"] - before) / before
+        print(f"{r['name']:>20}: {change * 100:+.1f}% MB/s against baseline")
+        if change < -threshold:
+            regressions.append(r["name"])
+    return regressions
+
+
+if __name__ == "__main__":
+    configurations = [
+        f"{backend}{mode}"
+        for backend in HtmlGameParser.BACKENDS
+        for mode in ["", "+prescan"]
+    ] + ["past"]
+    configurations += CSV_LOADERS
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="raw-html", help="Directory of pages")
+    parser.add_argument(
+        "--every",
+        type=int,
+        default=25,
+        help="Benchmark every n-th page of the corpus. 1 for the full set",
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=configurations,
+        default=configurations,
+        help="Configurations to run",
+    )
+    parser.add_argument(
+        "--csv", default="past.csv", help="CSV file for the CSV loaders"
+    )
+    parser.add_argument("--output", help="Where to write the results as JSON")
+    parser.add_argument("--baseline", help="Results of a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Fail if throughput drops by more than this fraction of the baseline",
+    )
+    args = parser.parse_args()
+
+    sample = {"corpus": args.corpus, "every": args.every, "csv": args.csv}
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        differences = sample_differences(baseline, sample)
+        if differences:
+            print(f"Not comparable with {args.baseline}: {'; '.join(differences)}")
+            sys.exit(1)
+
+    files = sample_files(args.corpus, args.every)
+    results = []
+    for name in args.only:
+        inputs = [args.csv] if name in CSV_LOADERS else files
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            r = executor.submit(measure, name, inputs).result()
+        print(
+            f"{r['name']:>20}: {r['pages_per_second']:8.2f} pages/s "
+            f"{r['games_per_second']:9.2f} games/s "
+            f"{r['megabytes_per_second']:7.2f} MB/s "
+            f"{r['peak_rss_mb']:7.1f} MB peak RSS"
+        )
+        results.append(r)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            report = {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                **sample,
+                "results": results,
+            }
+            f.write(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Throughput regression in: {', '.join(regressions)}")
+            sys.exit(1)
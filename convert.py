@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Convert files of games between CSV, JSON and NDJSON, e.g.:
+
+    ./convert.py nvl.json nvl.ndjson
+    ./convert.py past.csv past.ndjson
+
+CSV and NDJSON sources are streamed, game by game, into the destination.
+"""
+
+import argparse
+import csv
+
+from game import COLUMNS, Game
+from nvl import iter_ndjson, load_json, write_ndjson
+from past import write_json
+
+NDJSON = (".ndjson", ".jsonl")
+
+
+def read_csv(filename):
+    with open(filename, "r", newline="") as f:
+        yield from Game.read_csv(f)
+
+
+def write_csv(games, filename):
+    """Write the games, as they come, with every column of COLUMNS"""
+    written = 0
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(COLUMNS)
+        for g in games:
+            writer.writerow(g.row())
+            written += 1
+    return written
+
+
+def convert(source, destination):
+    """Return the number of games converted"""
+    if source.endswith(NDJSON):
+        games = iter_ndjson(source)
+    elif source.endswith(".json"):
+        games = load_json(source)
+    else:
+        games = read_csv(source)
+
+    if destination.endswith(NDJSON):
+        return write_ndjson(games, destination)
+    if destination.endswith(".json"):
+        games = list(games)
+        write_json(games, destination)
+        return len(games)
+    return write_csv(games, destination)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", help="CSV, JSON or NDJSON (.ndjson/.jsonl) file")
+    parser.add_argument("destination", help="File to write, format by extension")
+    args = parser.parse_args()
+
+    n = convert(args.source, args.destination)
+    print(f"Converted {n} games from {args.source} to {args.destination}")
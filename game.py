@@ -1,5 +1,9 @@
+import csv
 import logging
-from datetime import datetime
+from array import array
+from datetime import date, datetime, timedelta
+
+from names import NAMES
 
 DIVISIONS = {
     "195838": "Super League Women",
@@ -27,7 +31,147 @@ DIVISIONS = {
 }
 
 
+# sentinel for the points of a set that wasn't played
+UNPLAYED = -1
+# games store their date as days since 1970-01-01
+EPOCH = date(1970, 1, 1).toordinal()
+
+# how the sets of a game were given, for to_dict to give them back the same way
+SETS_NUMBERS = 0  # as numbers, or not at all
+SETS_TEXT = 1  # as text, e.g. scraped or read from a CSV file
+SETS_EMPTY = 2  # as empty text, e.g. merged from two games without sets
+
+
+# the columns of a CSV file of games with every field, as past.csv
+COLUMNS = [
+    "season",
+    "date",
+    "time",
+    "ID",
+    "home",
+    "home_sets",
+    "home_points",
+    "away",
+    "away_sets",
+    "away_points",
+    "division",
+    "category",
+    "venue",
+    "r1",
+    "r2",
+]
+
+# text of the usual numbers of points, to skip int() on the hot path
+TEXT_POINTS = {str(n): n for n in range(100)}
+TEXT_POINTS["-"] = UNPLAYED
+
+
+def to_int(value, default=0):
+    """Convert a number of sets or points to int, whatever it was stored as"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        return int(value)
+    return default
+
+
+def sets_format(value):
+    """SETS_* of a number of sets, as it was given"""
+    if isinstance(value, str):
+        return SETS_TEXT if value else SETS_EMPTY
+    return SETS_NUMBERS
+
+
+def five_sets(values):
+    """Points of the 5 sets as ints, from a list of numbers or strings"""
+    values = [
+        TEXT_POINTS[v] if v in TEXT_POINTS else to_int(v, UNPLAYED) for v in values
+    ]
+    if len(values) > 5:
+        Game.logger.error(f"Ignoring points after the 5th set: {values}")
+        del values[5:]
+    values.extend([UNPLAYED] * (5 - len(values)))
+    return values
+
+
+def _named(field):
+    """Property for a name stored as an ID of the NAMES catalogue"""
+    attribute = f"{field}_id"
+
+    def get(self):
+        return NAMES.names[getattr(self, attribute)]
+
+    def set(self, name):
+        setattr(self, attribute, NAMES.id(name))
+
+    return property(get, set)
+
+
 class Game(object):
+    __slots__ = (
+        "category_id",
+        "season_id",
+        "home_id",
+        "away_id",
+        "day",
+        "minute",
+        "r1_id",
+        "r2_id",
+        "venue_id",
+        "number",
+        "division_id",
+        "home_sets",
+        "away_sets",
+        "sets_format",
+        "points",
+    )
+
+    category = _named("category")
+    season = _named("season")
+    home = _named("home")
+    away = _named("away")
+    r1 = _named("r1")
+    r2 = _named("r2")
+    venue = _named("venue")
+    division = _named("division")
+
+    # what gets pickled: IDs are only valid in one process, so names are sent
+    STATE = (
+        "category",
+        "season",
+        "home",
+        "away",
+        "day",
+        "minute",
+        "r1",
+        "r2",
+        "venue",
+        "number",
+        "division",
+        "home_sets",
+        "away_sets",
+        "sets_format",
+        "points",
+    )
+
+    # fields merged from both games by merge() and __add__
+    MERGED = (
+        "timestamp",
+        "home",
+        "away",
+        "home_sets",
+        "home_points",
+        "away_sets",
+        "away_points",
+        "venue",
+        "r1",
+        "r2",
+        "category",
+        "division",
+    )
+
+    logger = logging.getLogger("Game")
+
     def __init__(self, attrs={}):
         self.category = None
         self.season = None
@@ -41,26 +185,67 @@ class Game(object):
         self.r1 = attrs["r1"] if "r1" in attrs else ""
         self.r2 = attrs["r2"] if "r2" in attrs else ""
         self.venue = attrs["venue"] if "venue" in attrs else ""
-        # self.number = attrs["number"] if "number" in attrs else ""
+        self.number = attrs["number"] if "number" in attrs else ""
         self.division = attrs["division"] if "division" in attrs else ""
-        self.home_sets = attrs["home_sets"] if "home_sets" in attrs else 0
-        self.away_sets = attrs["away_sets"] if "away_sets" in attrs else 0
+        self.home_sets = to_int(attrs.get("home_sets", 0))
+        self.away_sets = to_int(attrs.get("away_sets", 0))
+        self.sets_format = sets_format(attrs.get("home_sets", 0))
+
+        # points of each set, as [home 1, away 1, home 2, away 2, ...]
+        self.points = array("h", [UNPLAYED] * 10)
+        if "home_points" in attrs:
+            self.home_points = attrs["home_points"]
+        if "away_points" in attrs:
+            self.away_points = attrs["away_points"]
 
-        self.home_points = attrs["home_points"] if "home_points" in attrs else ["-"] * 5
-        self.away_points = attrs["away_points"] if "away_points" in attrs else ["-"] * 5
-        # fill to 5 sets with dashes
-        self.home_points.extend("-" * (5 - len(self.home_points)))
-        self.away_points.extend("-" * (5 - len(self.away_points)))
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.STATE}
 
-        self.logger = logging.getLogger(self.__class__.__name__)
+    def __setstate__(self, state):
+        for field, value in state.items():
+            setattr(self, field, value)
+
+    @property
+    def timestamp(self):
+        return datetime.fromordinal(self.day + EPOCH) + timedelta(minutes=self.minute)
+
+    @timestamp.setter
+    def timestamp(self, value):
+        self.day = value.toordinal() - EPOCH
+        self.minute = value.hour * 60 + value.minute
+
+    @property
+    def home_points(self):
+        """Points of the home team in each played set"""
+        return [p for p in self.points[0::2] if p != UNPLAYED]
+
+    @home_points.setter
+    def home_points(self, values):
+        self._set_points(0, values)
+
+    @property
+    def away_points(self):
+        """Points of the away team in each played set"""
+        return [p for p in self.points[1::2] if p != UNPLAYED]
+
+    @away_points.setter
+    def away_points(self, values):
+        self._set_points(1, values)
+
+    def _set_points(self, side, values):
+        self.points[side::2] = array("h", five_sets(values))
+
+    def points_text(self, side):
+        """Points of one side (0 home, 1 away) as strings, with '-' for unplayed sets"""
+        return [str(p) if p != UNPLAYED else "-" for p in self.points[side::2]]
 
     def __str__(self):
         return " | ".join(
             [
                 self.date(),
                 # self.time(),
-                f"{self.home} {self.home_sets} [{self.home_points}]",
-                f"{self.away} {self.away_sets} [{self.away_points}]",
+                f"{self.home} {self.home_sets} [{self.points_text(0)}]",
+                f"{self.away} {self.away_sets} [{self.points_text(1)}]",
                 self.division,
                 self.category,
                 self.venue,
@@ -70,28 +255,50 @@ class Game(object):
         )
 
     def __hash__(self):
-        return hash(self.division + self.home + self.away + self.date())
+        return hash((self.division_id, self.home_id, self.away_id, self.day))
 
     def __eq__(self, other):
         if other.__class__ is not Game:
             return False
 
         return (
-            self.division == other.division
-            and self.date() == other.date()
-            and self.home == other.home
-            and self.away == other.away
+            self.division_id == other.division_id
+            and self.day == other.day
+            and self.home_id == other.home_id
+            and self.away_id == other.away_id
             # and self.r1 == other.r1
             # and self.r2 == other.r2
         )
 
     def __lt__(self, other):
-        if self.timestamp < other.timestamp:
+        if (self.day, self.minute) < (other.day, other.minute):
             return True
-        if self.timestamp > other.timestamp:
+        if (self.day, self.minute) > (other.day, other.minute):
             return False
         return self.home < self.away
 
+    def sort_key(self):
+        """
+        Total order of the games in the files written: by date and time, then
+        by names and every other field, so that games at the same time always
+        come out the same way, whatever order they were parsed in
+        """
+        return (
+            self.day,
+            self.minute,
+            self.division or "",
+            self.category or "",
+            self.home or "",
+            self.away or "",
+            self.number or "",
+            self.home_sets,
+            self.away_sets,
+            self.points,
+            self.venue or "",
+            self.r1 or "",
+            self.r2 or "",
+        )
+
     def __add__(self, other):
         """
         Merge self and 'other'
@@ -100,39 +307,25 @@ class Game(object):
             self.logger.error(
                 f"Timestamps differ!: {self.timestamp} / {other.timestamp}"
             )
-        if self.division != other.division:
+        if self.division_id != other.division_id:
             self.logger.error(f"Divisions differ!: {self.division} / {other.division}")
         # if self.number != other.number:
         #     if self.number and other.number:
         #         self.logger.error(
         #             f"Game Numbers differ!: {self.number} / {other.number}"
         #         )
-        if self.home != other.home:
+        if self.home_id != other.home_id:
             self.logger.error(f"Home Teams differ!: {self.home} / {other.home}")
-        if self.away != other.away:
+        if self.away_id != other.away_id:
             self.logger.error(f"Away Teams differ!: {self.away} / {other.away}")
-        if self.r1 != other.r1:
+        if self.r1_id != other.r1_id:
             self.logger.error(f"R1 differ!: {self.r1} / {other.r1}")
-        if self.r2 != other.r2:
+        if self.r2_id != other.r2_id:
             self.logger.error(f"R2 differ!: {self.r2} / {other.r2}")
-        if self.venue != other.venue:
+        if self.venue_id != other.venue_id:
             self.logger.error(f"Venues differ!: {self.venue} / {other.venue}")
 
-        game = Game()
-        game.season = self.season
-        game.timestamp = self.pick(self.timestamp, other.timestamp, "time")
-        # game.number = self.pick(self.number, other.number, "number")
-        game.home = self.pick(self.home, other.home, "home")
-        game.away = self.pick(self.away, other.away, "away")
-        game.home_sets = self.pick(self.home_sets, other.home_sets, "home sets")
-        game.home_points = self.pick(self.home_points, other.home_points, "home points")
-        game.away_sets = self.pick(self.away_sets, other.away_sets, "away sets")
-        game.away_points = self.pick(self.away_points, other.away_points, "away points")
-        game.venue = self.pick(self.venue, other.venue, "venue")
-        game.r1 = self.pick(self.r1, other.r1, "R1")
-        game.r2 = self.pick(self.r2, other.r2, "R2")
-        game.category = self.pick(self.category, other.category, "category")
-        game.division = self.pick(self.division, other.division, "division")
+        game = self.merge(other)
 
         print(f"\nAdding:\n{self.csv()}\n{other.csv()}")
         print(f"Result:\n{game.csv()}")
@@ -156,6 +349,37 @@ class Game(object):
         #     self.timestamp = other.timestamp
         # return self
 
+    def merge(self, other, conflicts=None):
+        """
+        Merge self and 'other' like __add__, but quietly: differences are not
+        reported and nothing is printed, only pick() logs at debug level the
+        fields unset on both sides. 'other' wins when both are set.
+        If 'conflicts' is a list, (field, self value, other value) is appended
+        to it for every field that is set to different values on both sides
+        """
+        game = Game()
+        game.season = self.season
+        for field in self.MERGED:
+            a = getattr(self, field)
+            b = getattr(other, field)
+            if conflicts is not None and a and b and a != b:
+                conflicts.append((field, a, b))
+            setattr(game, field, self.pick(a, b, field))
+        game.home_sets = game.home_sets or 0
+        game.away_sets = game.away_sets or 0
+        # the sets __add__ picked when they were kept as given
+        given = self.pick(self.given_sets()[0], other.given_sets()[0], "home_sets")
+        game.sets_format = sets_format(given)
+        return game
+
+    def given_sets(self):
+        """The sets of both teams as they were given, see SETS_*"""
+        if self.sets_format == SETS_TEXT:
+            return str(self.home_sets), str(self.away_sets)
+        if self.sets_format == SETS_EMPTY:
+            return "", ""
+        return self.home_sets, self.away_sets
+
     def pick(self, a, b, name):
         if not a and b:
             return b
@@ -166,6 +390,48 @@ class Game(object):
             return ""
         return b
 
+    def to_record(self):
+        """
+        The game as a compact dict for NDJSON: numbers as ints and only the
+        points of the sets played
+        """
+        return {
+            "season": self.season,
+            "date": self.date(),
+            "time": f"{self.minute // 60:02d}:{self.minute % 60:02d}",
+            "number": self.number,
+            "home": self.home,
+            "away": self.away,
+            "home_sets": self.home_sets,
+            "away_sets": self.away_sets,
+            "home_points": self.home_points,
+            "away_points": self.away_points,
+            "division": self.division,
+            "category": self.category,
+            "venue": self.venue,
+            "r1": self.r1,
+            "r2": self.r2,
+        }
+
+    @staticmethod
+    def from_record(record):
+        """Game from a dict written by to_record"""
+        g = Game.__new__(Game)
+        g.season = record.get("season", "current")
+        g.day = date.fromisoformat(record["date"]).toordinal() - EPOCH
+        hours, _, minutes = record.get("time", "00:00").partition(":")
+        g.minute = int(hours) * 60 + int(minutes)
+        g.number = record.get("number", "")
+        for field in ["home", "away", "division", "category", "venue", "r1", "r2"]:
+            setattr(g, field, record.get(field, ""))
+        g.home_sets = to_int(record.get("home_sets", 0))
+        g.away_sets = to_int(record.get("away_sets", 0))
+        g.sets_format = SETS_NUMBERS
+        g.points = array("h", [UNPLAYED] * 10)
+        g.home_points = record.get("home_points", [])
+        g.away_points = record.get("away_points", [])
+        return g
+
     def to_dict(self):
         return {
             "home": self.home,
@@ -179,10 +445,10 @@ class Game(object):
             # "number": self.number,
             "division": self.division,
             "category": self.category,
-            "home_sets": self.home_sets,
-            "away_sets": self.away_sets,
-            "home_points": self.home_points,
-            "away_points": self.away_points,
+            "home_sets": self.given_sets()[0],
+            "away_sets": self.given_sets()[1],
+            "home_points": self.points_text(0),
+            "away_points": self.points_text(1),
             "season": self.season,
         }
 
@@ -196,10 +462,10 @@ class Game(object):
                     # self.number,
                     self.home,
                     str(self.home_sets),
-                    " ".join(self.home_points),
+                    " ".join(self.points_text(0)),
                     self.away,
                     str(self.away_sets),
-                    " ".join(self.away_points),
+                    " ".join(self.points_text(1)),
                     self.division,
                     self.category,
                     self.venue,
@@ -213,6 +479,26 @@ class Game(object):
             return ""
         return text
 
+    def row(self):
+        """Values of the game in the order of COLUMNS"""
+        return (
+            self.season,
+            self.date(),
+            f"{self.minute // 60:02d}:{self.minute % 60:02d}",
+            self.number,
+            self.home,
+            self.home_sets,
+            " ".join(self.points_text(0)),
+            self.away,
+            self.away_sets,
+            " ".join(self.points_text(1)),
+            self.division,
+            self.category,
+            self.venue,
+            self.r1,
+            self.r2,
+        )
+
     @staticmethod
     def from_csv(line):
         g = Game()
@@ -220,10 +506,11 @@ class Game(object):
         g.set_timestamp(f"{line['date']}T{line['time']}", numerical=True)
         g.number = line["ID"]
         g.home = line["home"]
-        g.home_sets = line["home_sets"]
+        g.home_sets = to_int(line["home_sets"])
         g.home_points = line["home_points"].split()
         g.away = line["away"]
-        g.away_sets = line["away_sets"]
+        g.away_sets = to_int(line["away_sets"])
+        g.sets_format = sets_format(line["home_sets"])
         g.away_points = line["away_points"].split()
         g.venue = line["venue"]
         g.category = line["category"]
@@ -232,6 +519,102 @@ class Game(object):
         g.r2 = line["r2"]
         return g
 
+    @staticmethod
+    def read_csv(csv_file):
+        """
+        Yield the games of an open CSV file, as written by write_csv.
+
+        Same result as calling from_csv on every row, but meant for whole files:
+        the rows are split by csv.reader, dates, times and points are parsed
+        once per distinct value, and the games are filled in directly instead
+        of going through __init__. The time, ID and season columns are optional
+        """
+        reader = csv.reader(csv_file)
+        header = next(reader, None)
+        if header is None:
+            return
+        yield from Game.from_rows(header, reader)
+
+    @staticmethod
+    def from_rows(header, rows):
+        """
+        Yield a game for each row of text values, in the columns of 'header'.
+        See read_csv
+        """
+        column = {name: i for i, name in enumerate(header)}
+        season = column.get("season")
+        time = column.get("time")
+        number = column.get("ID")
+        names = [
+            (f"{field}_id", column[field])
+            for field in ["home", "away", "venue", "category", "division", "r1", "r2"]
+        ]
+        date_column = column["date"]
+        home_sets = column["home_sets"]
+        away_sets = column["away_sets"]
+        home_points = column["home_points"]
+        away_points = column["away_points"]
+
+        days = {}
+        minutes = {"": 0}
+        points = {}
+        current = NAMES.id("current")
+        name_id = NAMES.id
+        new = Game.__new__
+
+        for row in rows:
+            if not row:
+                continue
+            g = new(Game)
+            g.season_id = name_id(row[season]) if season is not None else current
+            for attribute, i in names:
+                setattr(g, attribute, name_id(row[i]))
+
+            text = row[date_column]
+            day = days.get(text)
+            if day is None:
+                day = days[text] = date.fromisoformat(text).toordinal() - EPOCH
+            g.day = day
+            text = row[time] if time is not None else ""
+            minute = minutes.get(text)
+            if minute is None:
+                hours, _, mins = text.partition(":")
+                minute = minutes[text] = int(hours) * 60 + int(mins)
+            g.minute = minute
+
+            g.number = row[number] if number is not None else ""
+            g.home_sets = to_int(row[home_sets])
+            g.away_sets = to_int(row[away_sets])
+            g.sets_format = SETS_TEXT if row[home_sets] else SETS_EMPTY
+            key = (row[home_points], row[away_points])
+            sets = points.get(key)
+            if sets is None:
+                sets = [UNPLAYED] * 10
+                sets[0::2] = five_sets(key[0].split())
+                sets[1::2] = five_sets(key[1].split())
+                sets = points[key] = array("h", sets)
+            g.points = array("h", sets)
+            yield g
+
+    @staticmethod
+    def from_columns(columns):
+        """
+        Yield a game for each row of 'columns', a dict of {slot: values}.
+        Names are given as IDs of the NAMES catalogue (e.g. in "home_id") and
+        the points as the bytes of the 10 shorts of Game.points. The sets are
+        taken as read from a CSV file, unless "sets_format" is given
+        """
+        slots = list(columns)
+        new = Game.__new__
+        for row in zip(*columns.values()):
+            g = new(Game)
+            g.sets_format = SETS_TEXT
+            for slot, value in zip(slots, row):
+                if slot == "points":
+                    value = array("h", value)
+                setattr(g, slot, value)
+            yield g
+
     def set_timestamp(self, date_str, numerical=False):
         date_str = date_str.replace("th", "")
         date_str = date_str.replace("1st", "1")
@@ -244,7 +627,7 @@ class Game(object):
         self.timestamp = datetime.strptime(date_str, fmt)
 
     def date(self):
-        return self.timestamp.date().isoformat()
+        return date.fromordinal(self.day + EPOCH).isoformat()
 
     # def time(self):
     #     return self.timestamp.time().strftime("%H:%M")
@@ -252,16 +635,14 @@ class Game(object):
     def set_results(self, results):
         if not results:
             return
-        self.home_sets = results[0]
-        self.away_sets = results[1]
+        self.home_sets = to_int(results[0])
+        self.away_sets = to_int(results[1])
+        # scraped from the text of a page, even when parsed as numbers already
+        self.sets_format = SETS_TEXT
 
         self.home_points = results[2::2]
         self.away_points = results[3::2]
 
-        # fill to 5 sets with dashes
-        self.home_points.extend("-" * (5 - len(self.home_points)))
-        self.away_points.extend("-" * (5 - len(self.away_points)))
-
     def as_table_row(self):
         return (
             f"<tr><div>\n"
@@ -271,13 +652,13 @@ class Game(object):
             f"<td rowspan='2'>{self.division}</td>\n"
             f"<td>{self.home}</td>\n"
             f"<td class='sets'>{self.home_sets}</td>\n"
-            f"<td>{'</td><td>'.join(self.home_points)}</td>\n"
+            f"<td>{'</td><td>'.join(self.points_text(0))}</td>\n"
             f"<td rowspan='2'>{self.venue}</td>\n"
             f"<td rowspan='2'>{self.r1}</td>\n"
             f"<td rowspan='2'>{self.r2}</td>\n"
             "</tr>\n<tr>"
             f"<td>{self.away}</td>\n"
             f"<td class='sets'>{self.away_sets}</td>\n"
-            f"<td>{'</td><td>'.join(self.away_points)}</td>\n"
+            f"<td>{'</td><td>'.join(self.points_text(1))}</td>\n"
             "</div></tr>\n"
         )
@@ -0,0 +1,95 @@
+import numpy
+
+from game_table import AWAY_WIN, HOME_WIN, group_rows
+from names import NAMES
+
+
+def first_seen(keys):
+    """
+    Unique rows of 'keys' (a list of 1D arrays) in the order they first
+    appear, with the position of that first appearance and the number of
+    times they do
+    """
+    unique, first, _, counts = group_rows(keys)
+    order = numpy.argsort(first, kind="stable")
+    return unique[order], first[order], counts[order]
+
+
+class GameAggregates(object):
+    """
+    Every counter the HistoryPlotter charts are drawn from, computed together
+    from a GameTable with a handful of vectorized group-bys:
+
+        seasons                     labels of the seasons, sorted
+        results                     {(home_sets, away_sets): games}
+        wins                        {(division, HOME_WIN/AWAY_WIN/NO_WINNER): games}
+        games_per_season            {(season,): games}
+        games_per_season_division   {(season, division): games}
+        teams_per_season            {(season,): teams}
+        teams_per_season_division   {(season, division): teams}
+        referees_per_season_division
+                                    [(season, division, referees)], by first game
+        referee_games               {season: {referee: games}}, by first game
+
+    Labels are the names of the NAMES catalogue. The referee counters skip
+    games without referees; referee_games also skips the "unknown" ones.
+    """
+
+    def __init__(self, table):
+        self.seasons = table.unique("season")
+        self.results = table.count("home_sets", "away_sets")
+        self.wins = table.count("division", "winner")
+        self.games_per_season = table.count("season")
+        self.games_per_season_division = table.count("season", "division")
+        self.teams_per_season = table.count_teams("season")
+        self.teams_per_season_division = table.count_teams("season", "division")
+
+        # one row per referee of each game, R1 before R2, in the games' order
+        season = numpy.repeat(table.season, 2)
+        division = numpy.repeat(table.division, 2)
+        referee = numpy.stack([table.r1, table.r2], axis=1).ravel()
+        missing = [NAMES.find(None), NAMES.find("")]
+
+        named = ~numpy.isin(referee, missing)
+        self.referees_per_season_division = self._distinct(
+            [season[named], division[named], referee[named]]
+        )
+
+        known = named & (referee != NAMES.find("unknown"))
+        self.referee_games = {}
+        rows, _, counts = first_seen([season[known], referee[known]])
+        for (s, r), n in zip(rows.tolist(), counts.tolist()):
+            self.referee_games.setdefault(NAMES.names[s], {})[NAMES.names[r]] = n
+
+    @staticmethod
+    def _distinct(keys):
+        """
+        Number of different referees of each season and division, 'keys' being
+        the season, division and referee of every appointment. Seasons are in
+        the order they first appear, and so are the divisions of each season
+        """
+        triples, first, _ = first_seen(keys)
+        pairs, _, inverse, counts = group_rows([triples[:, 0], triples[:, 1]])
+        end = len(keys[0])
+        pair_first = numpy.full(len(pairs), end)
+        numpy.minimum.at(pair_first, inverse, first)
+        seasons, season_of = numpy.unique(pairs[:, 0], return_inverse=True)
+        season_first = numpy.full(len(seasons), end)
+        numpy.minimum.at(season_first, season_of, pair_first)
+        order = numpy.lexsort((pair_first, season_first[season_of]))
+        return [
+            (NAMES.names[s], NAMES.names[d], int(counts[i]))
+            for i, (s, d) in zip(order, pairs[order].tolist())
+        ]
+
+    def victories(self, division=None):
+        """Home and away victories, of every game or those of 'division'"""
+        home = away = 0
+        for (div, winner), n in self.wins.items():
+            if division is None or div == division:
+                home += n if winner == HOME_WIN else 0
+                away += n if winner == AWAY_WIN else 0
+        return home, away
+
+    def games_in_division(self, division):
+        return sum(n for (div, _), n in self.wins.items() if div == division)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Typed columnar copy of a CSV of games, as Arrow IPC files partitioned by
+season, which are memory-mapped when loaded instead of parsed as text:
+
+    ./game_dataset.py past.csv --dest past.arrow
+    ./generate_charts.py --history past.arrow
+"""
+
+import argparse
+import glob
+import logging
+import os
+
+import numpy
+import pyarrow
+import pyarrow.compute
+
+from game_table import GameTable
+from nvl import read_games
+
+# names stored dictionary-encoded, as (column, Game slot)
+NAMED = [
+    ("season", "season_id"),
+    ("home", "home_id"),
+    ("away", "away_id"),
+    ("division", "division_id"),
+    ("category", "category_id"),
+    ("venue", "venue_id"),
+    ("r1", "r1_id"),
+    ("r2", "r2_id"),
+]
+
+SCHEMA = pyarrow.schema(
+    [
+        (column, pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))
+        for column, _ in NAMED
+    ]
+    + [
+        ("date", pyarrow.date32()),
+        ("minute", pyarrow.int16()),
+        ("ID", pyarrow.string()),
+        ("home_sets", pyarrow.int8()),
+        ("away_sets", pyarrow.int8()),
+        # laid out like Game.points: home 1, away 1, home 2, away 2...
+        ("points", pyarrow.list_(pyarrow.int16(), 10)),
+    ]
+)
+
+logger = logging.getLogger("nvl")
+
+
+def to_arrow(games):
+    """Table of 'games', with the columns of SCHEMA"""
+    columns = {column: [getattr(g, column) for g in games] for column, _ in NAMED}
+    columns["date"] = numpy.array([g.day for g in games], dtype="datetime64[D]")
+    columns["minute"] = [g.minute for g in games]
+    columns["ID"] = [g.number for g in games]
+    columns["home_sets"] = [g.home_sets for g in games]
+    columns["away_sets"] = [g.away_sets for g in games]
+    points = numpy.frombuffer(b"".join(g.points.tobytes() for g in games), "int16")
+    columns["points"] = pyarrow.FixedSizeListArray.from_arrays(points, 10)
+    return pyarrow.table(
+        [
+            (
+                pyarrow.array(columns[field.name]).cast(field.type)
+                if field.name != "points"
+                else columns["points"]
+            )
+            for field in SCHEMA
+        ],
+        schema=SCHEMA,
+    )
+
+
+def write_dataset(games, directory):
+    """
+    Write 'games' as one uncompressed Arrow file per season, so that each can
+    be memory-mapped. Return the files written
+    """
+    os.makedirs(directory, exist_ok=True)
+    for old in glob.glob(os.path.join(directory, "season=*.arrow")):
+        os.remove(old)
+
+    seasons = {}
+    for g in games:
+        seasons.setdefault(g.season, []).append(g)
+
+    files = []
+    for season, season_games in sorted(seasons.items()):
+        filename = os.path.join(directory, f"season={season}.arrow")
+        table = to_arrow(season_games)
+        with pyarrow.OSFile(filename, "wb") as sink:
+            with pyarrow.ipc.new_file(sink, SCHEMA) as writer:
+                writer.write_table(table)
+        logger.info(f"Wrote {len(season_games)} games to {filename}")
+        files.append(filename)
+    return files
+
+
+def read_dataset(directory, seasons=None, divisions=None, categories=None):
+    """
+    Memory-map the files of 'directory' and return them as a single table.
+    Only the files of 'seasons' are opened, if given, and the rows are then
+    filtered by 'divisions' and 'categories'. Nothing is copied until a column
+    is converted or filtered
+    """
+    tables = []
+    for filename in sorted(glob.glob(os.path.join(directory, "season=*.arrow"))):
+        season = os.path.basename(filename)[len("season=") : -len(".arrow")]
+        if seasons is not None and season not in seasons:
+            continue
+        source = pyarrow.memory_map(filename, "r")
+        tables.append(pyarrow.ipc.open_file(source).read_all())
+    if not tables:
+        return SCHEMA.empty_table()
+    table = pyarrow.concat_tables(tables, promote_options="permissive")
+
+    for column, accepted in [("division", divisions), ("category", categories)]:
+        if accepted is not None:
+            values = table.column(column).cast(pyarrow.string())
+            table = table.filter(pyarrow.compute.is_in(values, pyarrow.array(accepted)))
+    return table
+
+
+def to_games(table):
+    """Games of an Arrow table, filled in directly from its columns"""
+    return GameTable.from_arrow(table).games()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", help="CSV or JSON of games")
+    parser.add_argument("--dest", required=True, help="Directory of the dataset")
+    args = parser.parse_args()
+
+    files = write_dataset(read_games(args.source), args.dest)
+    print(f"Wrote {len(files)} seasons to {args.dest}")
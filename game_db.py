@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+SQLite store for the games, indexed by season, division, category, referee,
+team and venue, so that the plotters can load a subset of the history.
+
+    ./game_db.py import past.csv nvl.csv --replace
+    ./game_db.py export season.csv --season 2019-2020 --category women
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sqlite3
+
+from game import COLUMNS, Game
+from nvl import read_games
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    season TEXT,
+    date TEXT,
+    time TEXT,
+    ID TEXT,
+    home TEXT,
+    home_sets INTEGER,
+    home_points TEXT,
+    away TEXT,
+    away_sets INTEGER,
+    away_points TEXT,
+    division TEXT,
+    category TEXT,
+    venue TEXT,
+    r1 TEXT,
+    r2 TEXT
+);
+CREATE INDEX IF NOT EXISTS games_season ON games (season);
+CREATE INDEX IF NOT EXISTS games_division ON games (division);
+CREATE INDEX IF NOT EXISTS games_category ON games (category);
+CREATE INDEX IF NOT EXISTS games_r1 ON games (r1);
+CREATE INDEX IF NOT EXISTS games_r2 ON games (r2);
+CREATE INDEX IF NOT EXISTS games_home ON games (home);
+CREATE INDEX IF NOT EXISTS games_away ON games (away);
+CREATE INDEX IF NOT EXISTS games_venue ON games (venue);
+CREATE INDEX IF NOT EXISTS games_key ON games (division, date, home, away);
+"""
+
+
+class GameDatabase(object):
+    """
+    Games stored in an SQLite file, one row per game with the columns of
+    past.csv (COLUMNS). Rows keep the order they were inserted in.
+    """
+
+    def __init__(self, filename="nvl.db"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def seasons(self):
+        rows = self.connection.execute("SELECT DISTINCT season FROM games")
+        return sorted(r[0] for r in rows)
+
+    def insert(self, games, replace=False):
+        """
+        Add 'games' in a single transaction. With 'replace', the seasons they
+        belong to are deleted first, so that importing a file again updates it.
+        Return the number of games inserted
+        """
+        rows = [g.row() for g in games]
+        with self.connection:
+            if replace:
+                seasons = sorted({r[0] for r in rows})
+                self.connection.executemany(
+                    "DELETE FROM games WHERE season = ?", [(s,) for s in seasons]
+                )
+            self.connection.executemany(
+                f"INSERT INTO games VALUES ({', '.join('?' * len(COLUMNS))})", rows
+            )
+        self.logger.info(f"Inserted {len(rows)} games into {self.filename}")
+        return len(rows)
+
+    def import_file(self, filename, replace=False):
+        """Insert the games of a CSV or JSON file"""
+        return self.insert(read_games(filename), replace=replace)
+
+    def select(
+        self,
+        seasons=None,
+        divisions=None,
+        categories=None,
+        referee=None,
+        team=None,
+        venue=None,
+    ):
+        """
+        Cursor over the rows matching every filter given. Lists match any of
+        their values; the referee and team can be either R1/R2 or home/away
+        """
+        conditions = []
+        values = []
+        for column, accepted in [
+            ("season", seasons),
+            ("division", divisions),
+            ("category", categories),
+        ]:
+            if accepted is not None:
+                conditions.append(f"{column} IN ({', '.join('?' * len(accepted))})")
+                values.extend(accepted)
+        if referee is not None:
+            conditions.append("(r1 = ? OR r2 = ?)")
+            values.extend([referee, referee])
+        if team is not None:
+            conditions.append("(home = ? OR away = ?)")
+            values.extend([team, team])
+        if venue is not None:
+            conditions.append("venue = ?")
+            values.append(venue)
+
+        query = f"SELECT {', '.join(COLUMNS)} FROM games"
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        return self.connection.execute(query + " ORDER BY rowid", values)
+
+    def load(self, **filters):
+        """The games matching 'filters' (see select)"""
+        return list(Game.from_rows(COLUMNS, self.select(**filters)))
+
+    def export_csv(self, filename, **filters):
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(COLUMNS)
+            writer.writerows(self.select(**filters))
+
+    def export_json(self, filename, **filters):
+        with open(filename, "w") as f:
+            f.write(json.dumps([g.to_dict() for g in self.load(**filters)], indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default="nvl.db", help="SQLite file of the games")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Add the games of CSV/JSON files")
+    importer.add_argument("files", nargs="+")
+    importer.add_argument(
+        "--replace",
+        action="store_true",
+        help="Replace the stored games of the seasons in each file",
+    )
+
+    exporter = commands.add_parser("export", help="Write games as CSV or JSON")
+    exporter.add_argument("file", help="Output file, .csv or .json")
+    exporter.add_argument("--season", nargs="+", dest="seasons")
+    exporter.add_argument("--division", nargs="+", dest="divisions")
+    exporter.add_argument("--category", nargs="+", dest="categories")
+    exporter.add_argument("--referee")
+    exporter.add_argument("--team")
+    exporter.add_argument("--venue")
+    args = parser.parse_args()
+
+    db = GameDatabase(args.db)
+    if args.command == "import":
+        for filename in args.files:
+            n = db.import_file(filename, replace=args.replace)
+            print(f"Imported {n} games from {filename}")
+    else:
+        filters = dict(
+            seasons=args.seasons,
+            divisions=args.divisions,
+            categories=args.categories,
+            referee=args.referee,
+            team=args.team,
+            venue=args.venue,
+        )
+        if args.file.endswith(".json"):
+            db.export_json(args.file, **filters)
+        else:
+            db.export_csv(args.file, **filters)
+    db.close()
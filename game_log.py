@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Incremental updates of a CSV file of games:
+
+    ./nvl.py raw-html/*.html --dest nvl.csv --incremental
+    ./game_log.py compact nvl.csv
+"""
+
+import argparse
+import csv
+import logging
+import os
+import sqlite3
+import tempfile
+import zlib
+
+from game import COLUMNS, Game
+
+# value of the columns that a file doesn't have
+MISSING = {"season": "current", "time": "00:00", "ID": ""}
+
+# where the current version of a game is
+BASE = 0
+LOG = 1
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    key TEXT PRIMARY KEY,
+    checksum INTEGER,
+    location INTEGER
+);
+CREATE INDEX IF NOT EXISTS games_location ON games (location);
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def has_log(filename):
+    """
+    Whether the CSV 'filename' has games appended by GameLog. A log that the
+    file was rewritten after is dropped first, see GameLog._load_index
+    """
+    if not os.path.exists(f"{filename}.log"):
+        return False
+    GameLog(filename)._load_index()
+    return os.path.exists(f"{filename}.log")
+
+
+class GameLog(object):
+    """
+    A canonical CSV of games plus an append-only log segment next to it.
+
+    append() writes only the games that are new or have changed to the log
+    (<file>.log, same columns), so an update costs as much as the games that
+    changed, whatever the size of the history. An SQLite index (<file>.idx)
+    keeps, for every key (division, category, date, home, away), a checksum
+    of its row and whether the current version is in the file or in the log;
+    rows of the file whose key has a newer version in the log are superseded.
+    Readers get the current games from rows() or games(); compact() folds the
+    log into the sorted canonical file.
+    """
+
+    def __init__(self, filename, max_log=None):
+        """
+        max_log: compact after an append leaves more than this many rows in
+          the log. None to only compact when asked
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.filename = filename
+        self.log_filename = f"{filename}.log"
+        self.index_filename = f"{filename}.idx"
+        self.max_log = max_log
+        self.index = None  # connection to the index, opened on first use
+
+    @staticmethod
+    def key(row):
+        """
+        Key of a row of COLUMNS: the one of Game.__eq__ plus the category, as
+        men's and women's games between clubs of the same name share the rest
+        """
+        return "\x1f".join((row[10], row[11], row[1], row[4], row[7]))
+
+    @staticmethod
+    def checksum(row):
+        return zlib.crc32("\x1f".join(row).encode())
+
+    def _read(self, filename):
+        """Rows of 'filename', in the order of COLUMNS whatever its header"""
+        if not os.path.exists(filename):
+            return
+        with open(filename, "r", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            if header == COLUMNS:
+                yield from (row for row in reader if row)
+                return
+            # e.g. written by write_csv, without time and ID
+            positions = [header.index(c) if c in header else None for c in COLUMNS]
+            for row in reader:
+                if row:
+                    yield [
+                        row[i] if i is not None else MISSING[c]
+                        for c, i in zip(COLUMNS, positions)
+                    ]
+
+    @staticmethod
+    def _stat(filename):
+        try:
+            st = os.stat(filename)
+            return f"{st.st_size}:{st.st_mtime_ns}"
+        except FileNotFoundError:
+            return "-"
+
+    def _signature(self):
+        """
+        Changes when the canonical file or the log are changed by something
+        else than this class, e.g. rewritten or deleted
+        """
+        return f"{self._stat(self.filename)} {self._stat(self.log_filename)}"
+
+    def _state(self, name, default=None):
+        row = self.index.execute(
+            "SELECT value FROM state WHERE name = ?", (name,)
+        ).fetchone()
+        return default if row is None else row[0]
+
+    def _set_state(self, **values):
+        self.index.executemany(
+            "INSERT OR REPLACE INTO state VALUES (?, ?)",
+            [(name, str(value)) for name, value in values.items()],
+        )
+
+    @property
+    def log_rows(self):
+        self._load_index()
+        return int(self._state("log_rows", 0))
+
+    def __len__(self):
+        self._load_index()
+        return self.index.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        try:
+            self.index = sqlite3.connect(self.index_filename)
+            self.index.executescript(INDEX_SCHEMA)
+        except sqlite3.DatabaseError:
+            # e.g. an index of an older version, in another format
+            self.index.close()
+            os.remove(self.index_filename)
+            self.index = sqlite3.connect(self.index_filename)
+            self.index.executescript(INDEX_SCHEMA)
+        if self._state("signature") == self._signature():
+            return
+
+        # the canonical file was rewritten without the log, e.g. by write_csv:
+        # the log holds changes of the old file, it would override the new one
+        base = self._state("base")
+        changed = base not in (None, self._stat(self.filename))
+        if changed and os.path.exists(self.log_filename):
+            self.logger.warning(
+                f"{self.filename} has changed since {self.log_filename} was "
+                "written, dropping the log"
+            )
+            os.remove(self.log_filename)
+
+        # first use, or the files changed: build it from the file and the log
+        self.logger.info(f"Indexing {self.filename}")
+        log_rows = 0
+        with self.index:
+            self.index.execute("DELETE FROM games")
+            self.index.executemany(
+                "INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                (
+                    (self.key(row), self.checksum(row), BASE)
+                    for row in self._read(self.filename)
+                ),
+            )
+            for row in self._read(self.log_filename):
+                self.index.execute(
+                    "INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                    (self.key(row), self.checksum(row), LOG),
+                )
+                log_rows += 1
+            self._set_state(
+                signature=self._signature(),
+                base=self._stat(self.filename),
+                log_rows=log_rows,
+            )
+
+    def append(self, games):
+        """
+        Add the games that are new or differ from their stored version to the
+        log. Return the number of games written
+        """
+        self._load_index()
+        new_log = not os.path.exists(self.log_filename)
+        written = 0
+        with self.index, open(self.log_filename, "a", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            if new_log:
+                writer.writerow(COLUMNS)
+            for g in games:
+                row = [str(value) for value in g.row()]
+                key = self.key(row)
+                checksum = self.checksum(row)
+                stored = self.index.execute(
+                    "SELECT checksum FROM games WHERE key = ?", (key,)
+                ).fetchone()
+                if stored is not None and stored[0] == checksum:
+                    continue
+                writer.writerow(row)
+                self.index.execute(
+                    "INSERT OR REPLACE INTO games VALUES (?, ?, ?)",
+                    (key, checksum, LOG),
+                )
+                written += 1
+            f.flush()
+            log_rows = int(self._state("log_rows", 0)) + written
+            self._set_state(signature=self._signature(), log_rows=log_rows)
+        self.logger.info(f"Appended {written} games to {self.log_filename}")
+
+        if self.max_log is not None and log_rows > self.max_log:
+            self.compact()
+        return written
+
+    def logged(self):
+        """Keys whose current version is in the log, new games or changed ones"""
+        self._load_index()
+        rows = self.index.execute("SELECT key FROM games WHERE location = ?", (LOG,))
+        return {key for (key,) in rows}
+
+    def superseded(self):
+        """Keys whose version in the canonical file has been replaced in the log"""
+        logged = self.logged()
+        return {
+            key for key in map(self.key, self._read(self.filename)) if key in logged
+        }
+
+    def rows(self):
+        """Current rows: those of the file not superseded, then the latest of the log"""
+        logged = self.logged()
+        for row in self._read(self.filename):
+            if self.key(row) not in logged:
+                yield row
+        latest = {}
+        for row in self._read(self.log_filename):
+            latest[self.key(row)] = row
+        yield from latest.values()
+
+    def games(self):
+        return list(Game.from_rows(COLUMNS, self.rows()))
+
+    def compact(self):
+        """Rewrite the canonical file, sorted, with the log folded in"""
+        games = sorted(self.games(), key=Game.sort_key)
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, temp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(COLUMNS)
+            for g in games:
+                writer.writerow([str(value) for value in g.row()])
+        os.replace(temp, self.filename)
+        if os.path.exists(self.log_filename):
+            os.remove(self.log_filename)
+        # the signature has changed: the index is built again from the file
+        self.index.close()
+        self.index = None
+        self._load_index()
+        self.logger.info(f"Compacted {len(games)} games into {self.filename}")
+        return len(games)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["compact", "status"])
+    parser.add_argument("file", help="Canonical CSV of games")
+    args = parser.parse_args()
+
+    log = GameLog(args.file)
+    if args.command == "compact":
+        print(f"Compacted {log.compact()} games into {args.file}")
+    else:
+        logged = log.logged()
+        superseded = log.superseded()
+        print(
+            f"{len(log)} games, {log.log_rows} rows in the log: "
+            f"{len(logged) - len(superseded)} new games, "
+            f"{len(superseded)} games superseded"
+        )
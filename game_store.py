@@ -0,0 +1,188 @@
+import logging
+
+from game import Game
+from names import NAMES
+
+
+class GameStore(object):
+    """
+    Games indexed by their natural key, (division, date, home, away), which is
+    the identity Game.__eq__ and Game.__hash__ use.
+
+    Looking up, adding or merging a game is a dict operation, so reconciling a
+    batch of games into the store is linear in the size of the batch. Games are
+    also indexed by season, and by fixture (division, home, away) to find a
+    game whose date has changed.
+    """
+
+    def __init__(self, games=()):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.games = {}  # key -> game, in insertion order
+        self.seasons = {}  # season ID -> {key: None}
+        self.fixtures = {}  # (division, home, away) IDs -> {key: None}
+        for g in games:
+            self.add(g)
+
+    @staticmethod
+    def key(game):
+        return (game.division_id, game.day, game.home_id, game.away_id)
+
+    @staticmethod
+    def fixture_key(game):
+        return (game.division_id, game.home_id, game.away_id)
+
+    def __len__(self):
+        return len(self.games)
+
+    def __iter__(self):
+        return iter(self.games.values())
+
+    def __contains__(self, game):
+        return self.key(game) in self.games
+
+    def get(self, game):
+        """The stored game with the same key as 'game', or None"""
+        return self.games.get(self.key(game))
+
+    def find(self, division, date, home, away):
+        """Look a game up by names and ISO date. Return None if it isn't stored"""
+        for g in self.fixture(division, home, away):
+            if g.date() == date:
+                return g
+        return None
+
+    def fixture(self, division, home, away):
+        """Games between 'home' and 'away' in 'division', on any date"""
+        key = (NAMES.find(division), NAMES.find(home), NAMES.find(away))
+        return [self.games[k] for k in self.fixtures.get(key, ())]
+
+    def season(self, season):
+        """Games of 'season', in the order they were added"""
+        return [self.games[k] for k in self.seasons.get(NAMES.find(season), ())]
+
+    def add(self, game):
+        """Store 'game', replacing any game with the same key"""
+        key = self.key(game)
+        previous = self.games.get(key)
+        if previous is not None and previous.season_id != game.season_id:
+            del self.seasons[previous.season_id][key]
+        self.games[key] = game
+        self.seasons.setdefault(game.season_id, {})[key] = None
+        self.fixtures.setdefault(self.fixture_key(game), {})[key] = None
+
+    def remove(self, game):
+        key = self.key(game)
+        stored = self.games.pop(key)
+        del self.seasons[stored.season_id][key]
+        del self.fixtures[self.fixture_key(stored)][key]
+        return stored
+
+    def upsert(self, games):
+        """
+        Merge each game into the stored one with the same key, quietly with
+        Game.merge, or add it if there is none. A summary is logged at the end.
+        Return the lists of added and merged games
+        """
+        added = []
+        merged = []
+        conflicts = []
+        for g in games:
+            stored = self.get(g)
+            if stored is None:
+                self.add(g)
+                added.append(g)
+            else:
+                self.add(stored.merge(g, conflicts))
+                merged.append(g)
+
+        counts = {}
+        for field, _, _ in conflicts:
+            counts[field] = counts.get(field, 0) + 1
+        self.logger.info(
+            f"Added {len(added)} games, merged {len(merged)}; "
+            f"fields changed: {counts or 'none'}"
+        )
+        return added, merged
+
+    def reconcile(self, games):
+        """
+        Merge a batch of games, e.g. scraped results into the stored fixtures,
+        with Game.merge instead of Game.__add__, so that nothing is printed per
+        game. A game with no stored match may have been rescheduled: it is
+        merged into the stored game of its fixture with the same number, see
+        rescheduled(). Without one it is added, and listed as ambiguous when
+        its teams have other games in the division.
+
+        Return a report of the games merged, moved, added and ambiguous, and of
+        every field that both sides set to different values
+        """
+        report = {
+            "merged": 0,
+            "moved": [],
+            "added": [],
+            "ambiguous": [],
+            "conflicts": [],
+        }
+        for g in games:
+            stored = self.get(g)
+            if stored is None:
+                stored, candidates = self.rescheduled(g)
+                if stored is None:
+                    self.add(g)
+                    if candidates:
+                        report["ambiguous"].append(
+                            dict(self.describe(g), games=[c.date() for c in candidates])
+                        )
+                    else:
+                        report["added"].append(self.describe(g))
+                    continue
+                self.remove(stored)
+                report["moved"].append(dict(self.describe(g), previous=stored.date()))
+
+            conflicts = []
+            merged = stored.merge(g, conflicts)
+            # Game.merge leaves the number out
+            merged.number = g.number or stored.number
+            self.add(merged)
+            report["merged"] += 1
+            for field, old, new in conflicts:
+                report["conflicts"].append(
+                    dict(self.describe(merged), field=field, stored=old, new=new)
+                )
+
+        counts = {}
+        for c in report["conflicts"]:
+            counts[c["field"]] = counts.get(c["field"], 0) + 1
+        report["conflicts_per_field"] = counts
+        return report
+
+    def rescheduled(self, game):
+        """
+        The stored game that 'game' is the rescheduled version of: the game of
+        the same fixture, on another date, with the same number. The same teams
+        may meet more than once in a division, so without a number the games
+        can't be told apart and none is picked.
+        Return (game or None, the other games of the fixture)
+        """
+        key = self.key(game)
+        candidates = [
+            self.games[k]
+            for k in self.fixtures.get(self.fixture_key(game), ())
+            if k != key
+        ]
+        same = [c for c in candidates if game.number and c.number == game.number]
+        return (same[0] if len(same) == 1 else None), candidates
+
+    @staticmethod
+    def describe(game):
+        """The key of 'game', with names, for reports"""
+        return {
+            "division": game.division,
+            "date": game.date(),
+            "home": game.home,
+            "away": game.away,
+        }
+
+    def sorted(self):
+        """The games in the order they are written, see Game.sort_key"""
+        return sorted(self.games.values(), key=Game.sort_key)
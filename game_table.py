@@ -0,0 +1,366 @@
+import csv
+from array import array
+from datetime import date
+
+import numpy
+import pandas
+
+from game import COLUMNS, EPOCH, UNPLAYED, Game, five_sets, to_int
+from game_log import GameLog, has_log
+from names import NAMES
+
+# categorical columns, stored as the IDs of the games in the NAMES catalogue
+CATEGORICAL = ["season", "division", "category", "home", "away", "r1", "r2", "venue"]
+
+# values of the winner column
+HOME_WIN = 1
+AWAY_WIN = -1
+NO_WINNER = 0
+
+# a full game has at least 3 sets of 25 points: anything under this is a
+# forfeit or a wrong result
+MIN_POINTS = 75
+
+
+def group_rows(keys):
+    """
+    Group the rows of 'keys', a list of 1D arrays of the same length. Return
+    the unique rows (a 2D array, sorted), the position of the first row of
+    each group, the group of every row and the size of each group.
+
+    Every column is first replaced by the index of its value, so that rows
+    are grouped as single ints instead of being sorted as records.
+    """
+    uniques, codes = [], []
+    for values in keys:
+        unique, code = numpy.unique(values, return_inverse=True)
+        uniques.append(unique)
+        codes.append(code.ravel())
+    if not len(codes[0]):
+        empty = numpy.empty((0, len(keys)), dtype=numpy.int64)
+        return empty, empty[:, 0], empty[:, 0], empty[:, 0]
+    shape = [len(u) for u in uniques]
+    packed = numpy.ravel_multi_index(codes, shape)
+    groups, first, inverse, counts = numpy.unique(
+        packed, return_index=True, return_inverse=True, return_counts=True
+    )
+    positions = numpy.unravel_index(groups, shape)
+    rows = numpy.column_stack([u[p] for u, p in zip(uniques, positions)])
+    return rows, first, inverse.ravel(), counts
+
+
+class GameTable(object):
+    """
+    Columnar container of games, backed by NumPy arrays.
+
+    Dates are stored as days since 1970-01-01, sets as small ints, the points
+    as a (games x 10) array laid out like Game.points, and every name as its
+    ID in the NAMES catalogue; times are minutes since midnight and "number"
+    holds the IDs of the games, as text. Selections are boolean masks:
+
+        table.select(table.mask(season="2019-2020") & (table.home_sets == 3))
+
+    Metrics derived from the result are computed once, when the table is built:
+
+        total_points  points played in the game
+        sets          number of sets played
+        winner        HOME_WIN, AWAY_WIN or NO_WINNER
+        margins       (games x 5) home minus away points of each set, 0 if unplayed
+        forfeit       a team was given the game without playing it out
+        covid         cancelled because of COVID, entered as 2-2
+        complete      a real result, fit for the points statistics
+
+    Game objects and a pandas DataFrame of the table are only built when
+    asked for, by games() and dataframe(), and then kept.
+    """
+
+    def __init__(self, columns):
+        """
+        columns: name -> numpy array, all with the same number of rows
+        """
+        self.columns = columns
+        self._games = None
+        self._dataframe = None
+
+    @classmethod
+    def from_games(cls, games):
+        codes = {column: [] for column in CATEGORICAL}
+        day, minute, number, home_sets, away_sets, points = [], [], [], [], [], []
+
+        for g in games:
+            for column in CATEGORICAL:
+                codes[column].append(getattr(g, f"{column}_id"))
+            day.append(g.day)
+            minute.append(g.minute)
+            number.append(g.number)
+            home_sets.append(g.home_sets)
+            away_sets.append(g.away_sets)
+            points.append(g.points)
+
+        columns = {
+            column: numpy.array(values, dtype=numpy.int32)
+            for column, values in codes.items()
+        }
+        columns["day"] = numpy.array(day, dtype=numpy.int32)
+        columns["minute"] = numpy.array(minute, dtype=numpy.int16)
+        columns["number"] = numpy.array(number, dtype=object)
+        columns["home_sets"] = numpy.array(home_sets, dtype=numpy.int8)
+        columns["away_sets"] = numpy.array(away_sets, dtype=numpy.int8)
+        columns["points"] = numpy.array(points, dtype=numpy.int16).reshape(-1, 10)
+        cls.derive(columns)
+        return cls(columns)
+
+    @classmethod
+    def from_rows(cls, header, rows):
+        """
+        Table of rows of text values in the columns of 'header', parsed
+        straight into columns, without building games. Like Game.from_rows,
+        the season, time and ID columns are optional
+        """
+        column = {name: i for i, name in enumerate(header)}
+        current = NAMES.id("current")
+        names = [(c, column.get(c)) for c in CATEGORICAL]
+        date_column = column["date"]
+        time = column.get("time")
+        number = column.get("ID")
+        home_sets = column["home_sets"]
+        away_sets = column["away_sets"]
+        home_points = column["home_points"]
+        away_points = column["away_points"]
+
+        codes = {c: array("i") for c in CATEGORICAL}
+        values = {c: array("i") for c in ["day", "minute", "home_sets", "away_sets"]}
+        numbers = []
+        points = []
+        days = {}
+        minutes = {"": 0}
+        sets = {}
+        name_id = NAMES.id
+
+        for row in rows:
+            if not row:
+                continue
+            for c, i in names:
+                codes[c].append(name_id(row[i]) if i is not None else current)
+
+            text = row[date_column]
+            day = days.get(text)
+            if day is None:
+                day = days[text] = date.fromisoformat(text).toordinal() - EPOCH
+            values["day"].append(day)
+            text = row[time] if time is not None else ""
+            minute = minutes.get(text)
+            if minute is None:
+                hours, _, mins = text.partition(":")
+                minute = minutes[text] = int(hours) * 60 + int(mins)
+            values["minute"].append(minute)
+
+            numbers.append(row[number] if number is not None else "")
+            values["home_sets"].append(to_int(row[home_sets]))
+            values["away_sets"].append(to_int(row[away_sets]))
+            key = (row[home_points], row[away_points])
+            game_points = sets.get(key)
+            if game_points is None:
+                game_points = [UNPLAYED] * 10
+                game_points[0::2] = five_sets(key[0].split())
+                game_points[1::2] = five_sets(key[1].split())
+                game_points = sets[key] = array("h", game_points).tobytes()
+            points.append(game_points)
+
+        columns = {c: numpy.array(codes[c], dtype=numpy.int32) for c in CATEGORICAL}
+        columns["day"] = numpy.array(values["day"], dtype=numpy.int32)
+        columns["minute"] = numpy.array(values["minute"], dtype=numpy.int16)
+        columns["number"] = numpy.array(numbers, dtype=object)
+        columns["home_sets"] = numpy.array(values["home_sets"], dtype=numpy.int8)
+        columns["away_sets"] = numpy.array(values["away_sets"], dtype=numpy.int8)
+        columns["points"] = (
+            numpy.frombuffer(b"".join(points), dtype=numpy.int16).reshape(-1, 10).copy()
+        )
+        cls.derive(columns)
+        return cls(columns)
+
+    @staticmethod
+    def derive(columns):
+        """Add the derived metrics to 'columns'"""
+        points = columns["points"]
+        home_sets = columns["home_sets"].astype(numpy.int16)
+        away_sets = columns["away_sets"].astype(numpy.int16)
+        played = (points[:, 0::2] != UNPLAYED) & (points[:, 1::2] != UNPLAYED)
+
+        total = numpy.where(points == UNPLAYED, 0, points).sum(axis=1)
+        columns["total_points"] = total.astype(numpy.int32)
+        columns["sets"] = (home_sets + away_sets).astype(numpy.int8)
+        columns["winner"] = numpy.sign(home_sets - away_sets).astype(numpy.int8)
+        columns["margins"] = numpy.where(
+            played, points[:, 0::2] - points[:, 1::2], 0
+        ).astype(numpy.int16)
+        columns["forfeit"] = ((home_sets == 3) | (away_sets == 3)) & (
+            total < MIN_POINTS
+        )
+        # games cancelled because of COVID were, for some reason, entered in the
+        # system with impossible results in the form:
+        # Home: 2 - 23 25 23 25 15
+        # Away: 2 - 25 23 25 23 15
+        columns["covid"] = (home_sets == 2) & (away_sets == 2)
+        columns["complete"] = (total >= MIN_POINTS) & ~columns["covid"]
+
+    @classmethod
+    def from_arrow(cls, arrow):
+        """
+        Table of an Arrow table with the columns of game_dataset.SCHEMA, built
+        from its arrays without creating games
+        """
+        columns = {}
+        for column in CATEGORICAL:
+            # intern each name once, then map the dictionary indices to their IDs
+            encoded = arrow.column(column).combine_chunks()
+            ids = numpy.array(
+                [NAMES.id(name) for name in encoded.dictionary.to_pylist()],
+                dtype=numpy.int32,
+            )
+            indices = encoded.indices.to_numpy(zero_copy_only=False)
+            columns[column] = ids[indices.astype(numpy.intp)]
+        days = arrow.column("date").cast("int32").to_numpy()
+        columns["day"] = days.astype(numpy.int32)
+        columns["minute"] = arrow.column("minute").to_numpy().astype(numpy.int16)
+        columns["number"] = numpy.array(arrow.column("ID").to_pylist(), dtype=object)
+        columns["home_sets"] = arrow.column("home_sets").to_numpy().astype(numpy.int8)
+        columns["away_sets"] = arrow.column("away_sets").to_numpy().astype(numpy.int8)
+        points = arrow.column("points").combine_chunks().flatten().to_numpy()
+        columns["points"] = points.astype(numpy.int16).reshape(-1, 10)
+        cls.derive(columns)
+        return cls(columns)
+
+    @classmethod
+    def from_csv(cls, filename):
+        """Table of a CSV file, with the games appended to its log (see GameLog)"""
+        if has_log(filename):
+            return cls.from_rows(COLUMNS, GameLog(filename).rows())
+        with open(filename, "r", newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            return cls.from_rows(next(reader), reader)
+
+    def games(self):
+        """The games of the table, built on first use"""
+        if self._games is None:
+            slots = {f"{c}_id": self.columns[c].tolist() for c in CATEGORICAL}
+            slots["day"] = self.columns["day"].tolist()
+            slots["minute"] = self.columns["minute"].tolist()
+            slots["number"] = self.columns["number"].tolist()
+            slots["home_sets"] = self.columns["home_sets"].tolist()
+            slots["away_sets"] = self.columns["away_sets"].tolist()
+            points = self.columns["points"].astype(numpy.int16).tobytes()
+            slots["points"] = [points[i : i + 20] for i in range(0, len(points), 20)]
+            self._games = list(Game.from_columns(slots))
+        return self._games
+
+    def dataframe(self):
+        """
+        DataFrame of the table, built on first use, with the columns of
+        past.csv (COLUMNS): names as categories, dates as datetimes, sets as
+        ints and the points as text, e.g. "25 23 15 - -"
+        """
+        if self._dataframe is None:
+            names = numpy.array(NAMES.names, dtype=object)
+            frame = {}
+            for column in COLUMNS:
+                if column in CATEGORICAL:
+                    frame[column] = pandas.Categorical(names[self.columns[column]])
+                elif column == "date":
+                    frame[column] = self.columns["day"].astype("datetime64[D]")
+                elif column == "time":
+                    minute = self.columns["minute"].astype(numpy.int32)
+                    frame[column] = [f"{m // 60:02}:{m % 60:02}" for m in minute]
+                elif column == "ID":
+                    frame[column] = self.columns["number"]
+                elif column in ("home_sets", "away_sets"):
+                    frame[column] = self.columns[column]
+                else:
+                    side = 0 if column == "home_points" else 1
+                    frame[column] = [
+                        " ".join(str(p) if p != UNPLAYED else "-" for p in row)
+                        for row in self.columns["points"][:, side::2].tolist()
+                    ]
+            self._dataframe = pandas.DataFrame(frame)
+        return self._dataframe
+
+    def __len__(self):
+        return len(self.columns["day"])
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def code(self, label):
+        """ID of 'label', or -1 if it isn't in the catalogue"""
+        return NAMES.find(label)
+
+    def decode(self, codes):
+        return [NAMES.names[c] for c in codes]
+
+    def values(self, column):
+        """The labels of a categorical column, one per game"""
+        return self.decode(self.columns[column])
+
+    def unique(self, column):
+        """The different labels of a categorical column, sorted"""
+        return sorted(self.decode(numpy.unique(self.columns[column])))
+
+    def mask(self, **conditions):
+        """
+        Boolean mask of the games where every column equals the given label.
+        A list of labels matches any of them
+        """
+        selected = numpy.ones(len(self), dtype=bool)
+        for column, label in conditions.items():
+            if isinstance(label, (list, tuple, set)):
+                codes = [self.code(x) for x in label]
+                selected &= numpy.isin(self.columns[column], codes)
+            else:
+                selected &= self.columns[column] == self.code(label)
+        return selected
+
+    def mask_contains(self, column, text):
+        """Boolean mask of the games whose label in 'column' contains 'text'"""
+        codes = [
+            code
+            for code in numpy.unique(self.columns[column])
+            if NAMES.names[code] and text in NAMES.names[code]
+        ]
+        return numpy.isin(self.columns[column], codes)
+
+    def select(self, mask):
+        """A new table with the rows in 'mask'"""
+        return GameTable({name: values[mask] for name, values in self.columns.items()})
+
+    def count(self, *columns):
+        """
+        Number of games for each combination of values of 'columns'.
+        Return a dict of {(label or value, ...): count}
+        """
+        unique, _, _, counts = group_rows([self.columns[c] for c in columns])
+        return {
+            tuple(self._label(c, v) for c, v in zip(columns, row)): int(n)
+            for row, n in zip(unique, counts)
+        }
+
+    def count_teams(self, *columns):
+        """
+        Number of different teams, home or away, for each combination of
+        values of 'columns'. Return a dict of {(label, ...): count}
+        """
+        keys = [numpy.concatenate([self.columns[c]] * 2) for c in columns]
+        teams = numpy.concatenate([self.columns["home"], self.columns["away"]])
+        pairs = group_rows(keys + [teams])[0]
+        groups, _, _, counts = group_rows(list(pairs[:, :-1].T))
+        return {
+            tuple(self._label(c, v) for c, v in zip(columns, row)): int(n)
+            for row, n in zip(groups, counts)
+        }
+
+    def _label(self, column, value):
+        if column in CATEGORICAL:
+            return NAMES.names[value]
+        return value.item()
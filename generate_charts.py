@@ -7,11 +7,32 @@ from season_plotter import SeasonPlotter
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--publish", action="store_true", help="Create HTML files")
+    parser.add_argument(
+        "--history",
+        default="past.csv",
+        help="Games of past seasons: CSV, SQLite database or Arrow dataset",
+    )
+    parser.add_argument(
+        "--season",
+        default="nvl.csv",
+        help="Games of the current season: CSV, SQLite database or Arrow dataset",
+    )
+    parser.add_argument(
+        "--all-referees",
+        action="store_true",
+        help="Chart every referee of the season, not only the referee subset",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes generating the charts of the referees",
+    )
     args = parser.parse_args()
 
-    history = HistoryPlotter("past.csv", write_files=args.publish)
-    season = SeasonPlotter("nvl.csv", write_files=args.publish)
-    actionable = InteractivePlotter("nvl.csv", write_files=args.publish)
+    history = HistoryPlotter(args.history, write_files=args.publish)
+    season = SeasonPlotter(args.season, write_files=args.publish)
+    actionable = InteractivePlotter(args.season, write_files=args.publish)
 
     history.plot_total_points_by_category()
     history.plot_total_points_per_number_of_sets()
@@ -30,12 +51,11 @@ if __name__ == "__main__":
     season.plot_referee_team_diversity()
     season.plot_referee_team_diversity_index()
 
-    # REFEREES - Individual charts
-    for r in history.referee_subset:  # TODO: change to the full set of referees
-        actionable.referee_plot_role_count(r)  # fixme: github issue #6
-        actionable.referee_plot_division_count(r)  # fixme: github issue #6
-        actionable.referee_plot_category_count(r)  # fixme: github issue #6
-        actionable.referee_plot_team_count(r)  # fixme: github issue #6
+    # REFEREES - Individual charts, in web/charts/referees/<referee>-<hash>/
+    referees = None if args.all_referees else history.referee_subset
+    # fixme: github issue #6
+    charted = actionable.plot_referees(referees, jobs=args.jobs)
+    print(f"Charts of {len(charted)} referees")
 
     actionable.referee_plot_venue_count()
     actionable.referee_plot_game_count_over_time()
@@ -1,11 +1,11 @@
 import inspect
 import statistics
-from collections import Counter
 
 import pandas
 import plotly.graph_objects as go
 from plotly import express as px
 
+from game_aggregates import GameAggregates
 from nvl_plotter import NvlPlotter
 
 
@@ -14,29 +14,18 @@ class HistoryPlotter(NvlPlotter):
     Generate charts from all the data (i.e. 20 years)
     """
 
+    def __init__(self, filename: str, write_files=False, **filters):
+        super().__init__(filename, write_files, **filters)
+        # what the charts count, computed once for all of them
+        self.aggregates = GameAggregates(self.table)
+
     def plot_total_points_by_category(self):
         """
         Histogram of the total number of points per game, by category
         """
-        points = []
-        sex = []
-
-        for game in self.games:
-            total = sum(
-                [int(x) for x in game.home_points + game.away_points if x.isnumeric()]
-            )
-            if total < 75:  # this result is wrong and should be ignored
-                # print("Invalid result: ", game.csv())
-                continue
-            if game.home_sets == "2" and game.away_sets == "2":
-                # Apparently, games cancelled because of COVID were, for some reason,
-                # entered in the system with impossible results in the form:
-                # Home: 2 - 23 25 23 25 15
-                # Away: 2 - 25 23 25 23 15
-                # print("COVID game:", game.csv())
-                continue
-            points.append(total)
-            sex.append(game.category)
+        games = self.table.select(self.table.complete)
+        points = games.total_points.tolist()
+        sex = games.values("category")
 
         print(f"MAX: {max(points)}")
         print(f"MIN: {min(points)}")
@@ -66,19 +55,9 @@ class HistoryPlotter(NvlPlotter):
         """
         Histogram of the total number of points per game, per number of sets
         """
-        points = []
-        sets = []
-
-        for game in self.games:
-            total = sum(
-                [int(x) for x in game.home_points + game.away_points if x.isnumeric()]
-            )
-            if total < 75:  # this result is wrong and should be ignored
-                continue
-            if game.home_sets == "2" and game.away_sets == "2":
-                continue
-            points.append(total)
-            sets.append(f"{int(game.home_sets) + int(game.away_sets)} sets")
+        games = self.table.select(self.table.complete)
+        points = games.total_points.tolist()
+        sets = [f"{n} sets" for n in games.sets.tolist()]
 
         df = pandas.DataFrame(dict(points=points, sets=sets))
         fig = px.histogram(
@@ -98,20 +77,9 @@ class HistoryPlotter(NvlPlotter):
 
     def plot_home_victories(self):
         """Percentage of home victories vs away victories"""
-        results = []
-        for g in self.games:
-            r = {
-                "home": g.home_sets,
-                "away": g.away_sets,
-                "division": g.division,
-                "category": g.category,
-            }
-            results.append(r)
-
         # TODO: take into account forfeited games. Add them as two
         # new sections: forfeited away and forfeited home
-        home_victories = len(list(filter(lambda g: g["home"] > g["away"], results)))
-        away_victories = len(list(filter(lambda g: g["home"] < g["away"], results)))
+        home_victories, away_victories = self.aggregates.victories()
 
         df = pandas.DataFrame(
             dict(where=["Home", "Away"], count=[home_victories, away_victories])
@@ -126,16 +94,6 @@ class HistoryPlotter(NvlPlotter):
 
     def plot_home_victories_per_division(self):
         """Percentage of home victories vs away victories, by division"""
-        results = []
-        for g in self.games:
-            r = {
-                "home": g.home_sets,
-                "away": g.away_sets,
-                "division": g.division,
-                "category": g.category,
-            }
-            results.append(r)
-
         data = []
         divs = [
             "superleague",
@@ -146,18 +104,8 @@ class HistoryPlotter(NvlPlotter):
             "shield",
         ]
         for div in divs:
-            total = len(list(filter(lambda f: f["division"] == div, results)))
-            home_victories = (
-                    len(
-                        list(
-                            filter(
-                                lambda g: g["home"] > g["away"] and g["division"] == div,
-                                results,
-                            )
-                        )
-                    )
-                    / total
-            )
+            total = self.aggregates.games_in_division(div)
+            home_victories = self.aggregates.victories(div)[0] / total
             away_victories = 1 - home_victories
             data.extend([home_victories, away_victories])
 
@@ -210,8 +158,14 @@ class HistoryPlotter(NvlPlotter):
 
     def plot_number_of_games_per_season(self):
         """Number of games played per season"""
-        seasons = [g.season for g in self.games]
-        fig = px.histogram(seasons, title="Number of games per season")
+        count = self.aggregates.games_per_season
+        df = pandas.DataFrame(
+            dict(
+                season=self.aggregates.seasons,
+                count=[count[(s,)] for s in self.aggregates.seasons],
+            )
+        )
+        fig = px.bar(df, x="season", y="count", title="Number of games per season")
         fig.update_layout(bargap=0.2, showlegend=False)
         if self.publish:
             fig.write_html(f"web/charts/{inspect.stack()[0][3]}.html")
@@ -221,21 +175,19 @@ class HistoryPlotter(NvlPlotter):
     def plot_number_of_games_per_season_by_division(self):
         """Number of games played per season, per division"""
         series = []
-        seasons = set(self.dataframe["season"])
+        divisions = [
+            "superleague",
+            "division_1",
+            "division_2",
+            "division_3",
+            "cup",
+            "shield",
+        ]
+        count = self.aggregates.games_per_season_division
 
-        for the_season in sorted(seasons):
-            games = self.dataframe[self.dataframe["season"] == the_season]
-            count = Counter(games["division"])
+        for the_season in self.aggregates.seasons:
             series.append(
-                [
-                    the_season,
-                    count["superleague"],
-                    count["division_1"],
-                    count["division_2"],
-                    count["division_3"],
-                    count["cup"],
-                    count["shield"],
-                ]
+                [the_season] + [count.get((the_season, div), 0) for div in divisions]
             )
 
         df = pandas.DataFrame(
@@ -258,12 +210,9 @@ class HistoryPlotter(NvlPlotter):
     def plot_number_of_teams_per_season(self):
         """Plot number of teams per year"""
         series = []
-        seasons = set(self.dataframe["season"])
-        for the_season in sorted(seasons):
-            count = []
-            games = self.dataframe[self.dataframe["season"] == the_season]
-            count.append(len(set(games["home"]).union(set(games["away"]))))
-            series.append([the_season] + count)
+        count = self.aggregates.teams_per_season
+        for the_season in self.aggregates.seasons:
+            series.append([the_season, count[(the_season,)]])
 
         df = pandas.DataFrame(series, columns=["Season", "count"])
         fig = px.bar(
@@ -281,7 +230,6 @@ class HistoryPlotter(NvlPlotter):
     def plot_number_of_teams_per_season_by_division(self):
         """Number of teams registered each year, per division"""
         series = []
-        seasons = set(self.dataframe["season"])
         divisions = [
             "superleague",
             "division_1",
@@ -290,13 +238,11 @@ class HistoryPlotter(NvlPlotter):
             "cup",
             "shield",
         ]
-        for the_season in sorted(seasons):
-            count = []
-            for div in divisions:
-                games = self.dataframe[self.dataframe["season"] == the_season]
-                division = games[games["division"] == div]
-                count.append(len(set(division["home"]).union(set(division["away"]))))
-            series.append([the_season] + count)
+        count = self.aggregates.teams_per_season_division
+        for the_season in self.aggregates.seasons:
+            series.append(
+                [the_season] + [count.get((the_season, div), 0) for div in divisions]
+            )
 
         df = pandas.DataFrame(
             series,
@@ -329,21 +275,10 @@ class HistoryPlotter(NvlPlotter):
         # TODO: maybe remove the forfeited games (either 3-0 or 0-3)
         # where one team has 0 total points. Or add them as sections.
         # They skew the result and I think it's an outlier
-        for game in self.games:
-            if game.home_sets == "3":
-                if game.away_sets == "0":
-                    results["3-0"] += 1
-                elif game.away_sets == "1":
-                    results["3-1"] += 1
-                elif game.away_sets == "2":
-                    results["3-2"] += 1
-            elif game.away_sets == "3":
-                if game.home_sets == "0":
-                    results["0-3"] += 1
-                elif game.home_sets == "1":
-                    results["1-3"] += 1
-                elif game.home_sets == "2":
-                    results["2-3"] += 1
+        count = self.aggregates.results
+        for key in results:
+            home, away = key.split("-")
+            results[key] = count.get((int(home), int(away)), 0)
 
         df = pandas.DataFrame(dict(keys=results.keys(), values=results.values()))
 
@@ -372,32 +307,11 @@ class HistoryPlotter(NvlPlotter):
 
     def plot_referees_per_year(self):
         """Plot total number of referees per year"""
-        # years = [g.timestamp.year for g in self.games]
-        count = {}
-        for g in self.games:
-            div = g.division
-            r1 = g.r1
-            r2 = g.r2
-
-            if not r1 and not r2:
-                continue
-
-            s = g.season
-            if s not in count:
-                count[s] = {}
-            if div not in count[s]:
-                count[s][div] = set()
-            if r1:
-                count[s][div].add(r1)
-            if r2:
-                count[s][div].add(r2)
-
         years, divs, refs = [], [], []
-        for s in count:
-            for d in count[s]:
-                years.append(str(s))
-                divs.append(d)
-                refs.append(str(len(count[s][d])))
+        for s, d, n in self.aggregates.referees_per_season_division:
+            years.append(str(s))
+            divs.append(d)
+            refs.append(str(n))
 
         df = pandas.DataFrame(dict(years=years, divisions=divs, refs=refs))
         fig = px.histogram(
@@ -542,21 +456,11 @@ class HistoryPlotter(NvlPlotter):
         """
 
         # Get all unique seasons for dropdown
-        seasons = sorted(list(set(game.season for game in self.games)))
+        seasons = self.aggregates.seasons
 
         # Function to get referee counts for a specific season
         def get_referee_counts(season):
-            referee_counts = Counter()
-
-            for game in self.games:
-                if game.season == season:
-                    # Count both r1 and r2 referees
-                    if game.r1 and game.r1 != 'unknown':  # Check if r1 is not empty
-                        referee_counts[game.r1] += 1
-                    if game.r2 and game.r2 != 'unknown':  # Check if r2 is not empty
-                        referee_counts[game.r2] += 1
-
-            return referee_counts
+            return self.aggregates.referee_games.get(season, {})
 
         # Create initial treemap for first season
         initial_season = seasons[0] if seasons else None
@@ -0,0 +1,89 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+_DISABLED = nullcontext()
+
+
+class Instrumentation(object):
+    """
+    Counters and timers for the stages of the parsing pipeline.
+
+    Stages are timed with 'with stats.stage("dom"):' and attributed to the file
+    being processed, between start_file() and end_file(). When disabled, stage() returns a
+    shared no-op context manager and count() returns straight away, so the
+    calls can stay in the hot loop.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}  # stage -> [calls, seconds]
+        self.counters = Counter()
+        self.files = {}  # filename -> {stage or counter: value}
+        self.current = None
+
+    def start_file(self, filename):
+        if not self.enabled:
+            return
+        self.current = self.files.setdefault(filename, {})
+
+    def end_file(self):
+        """Stages and counters from now on belong to no file"""
+        self.current = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            calls_seconds = self.stages.setdefault(name, [0, 0.0])
+            calls_seconds[0] += 1
+            calls_seconds[1] += elapsed
+            if self.current is not None:
+                key = f"{name}_seconds"
+                self.current[key] = self.current.get(key, 0.0) + elapsed
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        self.counters[name] += n
+        if self.current is not None:
+            self.current[name] = self.current.get(name, 0) + n
+
+    def fresh(self):
+        """An empty instance with the same settings, e.g. for a worker process"""
+        return Instrumentation(self.enabled)
+
+    def merge(self, other):
+        """Add the measurements of 'other' to these ones"""
+        for name, (calls, seconds) in other.stages.items():
+            calls_seconds = self.stages.setdefault(name, [0, 0.0])
+            calls_seconds[0] += calls
+            calls_seconds[1] += seconds
+        self.counters.update(other.counters)
+        for filename, values in other.files.items():
+            totals = self.files.setdefault(filename, {})
+            for key, value in values.items():
+                totals[key] = totals.get(key, 0) + value
+
+    def report(self):
+        return {
+            "stages": {
+                name: {"calls": calls, "seconds": round(seconds, 6)}
+                for name, (calls, seconds) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "files": self.files,
+        }
+
+    def write_json(self, filename):
+        with open(filename, "w") as f:
+            f.write(json.dumps(self.report(), indent=2))
@@ -1,14 +1,77 @@
 import inspect
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas
 import plotly.graph_objects as go
+from names import NAMES
 from nvl_plotter import NvlPlotter
 from plotly import express as px
+from referee_index import RefereeIndex
+
+# the charts of a single referee
+REFEREE_CHARTS = [
+    "referee_plot_role_count",
+    "referee_plot_division_count",
+    "referee_plot_category_count",
+    "referee_plot_team_count",
+]
+
+# plotter of the pool workers of plot_referees: inherited from the parent
+# process when workers are forked, loaded again by _init_worker otherwise
+_worker_plotter = None
+
+
+def _init_worker(filename, write_files, filters):
+    global _worker_plotter
+    if _worker_plotter is None:
+        _worker_plotter = InteractivePlotter(filename, write_files, **filters)
+
+
+def _plot_referee(ref_name):
+    _worker_plotter.plot_referee(ref_name)
+    return ref_name
 
 
 class InteractivePlotter(NvlPlotter):
     """Generate interactive charts, where you can choose from a dropdown"""
+
+    def __init__(self, filename: str, write_files=False, **filters):
+        super().__init__(filename, write_files, **filters)
+        # the games of each referee, for the referee_plot_* charts
+        self.referees = RefereeIndex(self.table)
+
+    def plot_referee(self, ref_name):
+        """Every chart of a single referee (REFEREE_CHARTS)"""
+        for chart in REFEREE_CHARTS:
+            getattr(self, chart)(ref_name)
+
+    def plot_referees(self, referees=None, jobs=1):
+        """
+        The charts of each referee in 'referees', every referee by default,
+        written to their own directory (see NvlPlotter.write_html). With jobs > 1 the
+        referees are spread over a pool of processes, which share the data
+        loaded by this plotter. Return the referees charted
+        """
+        global _worker_plotter
+        if referees is None:
+            referees = self.referees.names()
+        if jobs <= 1:
+            for ref_name in referees:
+                self.plot_referee(ref_name)
+            return list(referees)
+
+        _worker_plotter = self
+        try:
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(self.filename, self.publish, self.filters),
+            ) as executor:
+                return list(executor.map(_plot_referee, referees, chunksize=4))
+        finally:
+            _worker_plotter = None
+
     def referee_plot_game_count_over_time(self):
         """
         Interactive bar chart, showing the number of games
@@ -86,11 +149,7 @@ class InteractivePlotter(NvlPlotter):
 
     def referee_plot_role_count(self, ref_name):
         """Plot the number of R1 vs R2 roles for a particular referee"""
-        r1 = len(list(filter(lambda g: g.r1 == ref_name, self.games)))
-        r2 = len(list(filter(lambda g: g.r2 == ref_name, self.games)))
-        both = len(
-            list(filter(lambda g: g.r1 == ref_name and g.r2 == ref_name, self.games))
-        )
+        r1, r2, both = self.referees.roles(ref_name)
 
         donut_colors = ["#26547C", "#EF476F", "#FFD166", "#06D6A0"]
         labels = ["Ref1", "Ref2", "Both"]
@@ -111,18 +170,18 @@ class InteractivePlotter(NvlPlotter):
             textinfo="label+percent+value", marker=dict(colors=donut_colors)
         )
         if self.publish:
-            fig.write_html(f"web/charts/{inspect.stack()[0][3]}.html")
+            self.write_html(fig, inspect.stack()[0][3], ref_name)
         else:
             fig.show()
 
     def referee_plot_division_count(self, ref_name):
         """Plot the number of games by a particular referee, per division"""
         # TODO: split by category as well, in similar color shade
-        games = list(filter(lambda g: g.r1 == ref_name or g.r2 == ref_name, self.games))
-        sl = len(list(filter(lambda g: "Super" in g.division, games)))
-        div1 = len(list(filter(lambda g: "Division 1" in g.division, games)))
-        div2 = len(list(filter(lambda g: "Division 2" in g.division, games)))
-        div3 = len(list(filter(lambda g: "Division 3" in g.division, games)))
+        games = self.referees.select(ref_name)
+        sl = int(games.mask_contains("division", "Super").sum())
+        div1 = int(games.mask_contains("division", "Division 1").sum())
+        div2 = int(games.mask_contains("division", "Division 2").sum())
+        div3 = int(games.mask_contains("division", "Division 3").sum())
 
         donut_colors = ["#26547C", "#EF476F", "#FFD166", "#06D6A0"]
         labels = ["SuperLeague", "Div1", "Div2", "Div3"]
@@ -142,15 +201,15 @@ class InteractivePlotter(NvlPlotter):
             textinfo="label+percent+value", marker=dict(colors=donut_colors)
         )
         if self.publish:
-            fig.write_html(f"web/charts/{inspect.stack()[0][3]}.html")
+            self.write_html(fig, inspect.stack()[0][3], ref_name)
         else:
             fig.show()
 
     def referee_plot_category_count(self, ref_name):
         """Plot the number of games by a particular referee, per category"""
-        games = list(filter(lambda g: g.r1 == ref_name or g.r2 == ref_name, self.games))
-        men = len(list(filter(lambda g: "men" == g.category, games)))
-        ladies = len(list(filter(lambda g: "women" == g.category, games)))
+        games = self.referees.select(ref_name)
+        men = int(games.mask(category="men").sum())
+        ladies = int(games.mask(category="women").sum())
 
         donut_colors = ["#26547C", "#EF476F", "#FF66", "#06D6A0"]
         labels = ["Men", "Ladies"]
@@ -170,17 +229,19 @@ class InteractivePlotter(NvlPlotter):
             textinfo="label+percent+value", marker=dict(colors=donut_colors)
         )
         if self.publish:
-            fig.write_html(f"web/charts/{inspect.stack()[0][3]}.html")
+            self.write_html(fig, inspect.stack()[0][3], ref_name)
         else:
             fig.show()
 
     def referee_plot_team_count(self, ref_name):
         """Plot the number of times a referee has officiated each team"""
-        games = list(filter(lambda g: g.r1 == ref_name or g.r2 == ref_name, self.games))
+        games = self.referees.select(ref_name)
         teams = []
-        for g in games:
-            teams.append(f"{g.home} ({g.division})")
-            teams.append(f"{g.away} ({g.division})")
+        for home, away, division in zip(
+            games.values("home"), games.values("away"), games.values("division")
+        ):
+            teams.append(f"{home} ({division})")
+            teams.append(f"{away} ({division})")
 
         print(f"Total teams: {len(teams)}")
         import collections
@@ -201,7 +262,7 @@ class InteractivePlotter(NvlPlotter):
             xaxis={"title": "Times refereed"},
         )
         if self.publish:
-            fig.write_html(f"web/charts/{inspect.stack()[0][3]}.html")
+            self.write_html(fig, inspect.stack()[0][3], ref_name)
         else:
             fig.show()
 
@@ -413,8 +474,9 @@ class InteractivePlotter(NvlPlotter):
         # TODO: esto es una movida porque por ejemplo,
         #  City of Bristol se llama igual en hombres que en mujeres.
         #  Igual para otros equipos (p.ej. Bristol)
+        team_id = NAMES.find(team_name)
         games = list(
-            filter(lambda g: g.home == team_name or g.away == team_name, self.games)
+            filter(lambda g: g.home_id == team_id or g.away_id == team_id, self.games)
         )
         refs = []
         for g in games:
@@ -0,0 +1,35 @@
+class NameCatalogue(object):
+    """
+    Maps each name (team, referee, venue, division...) to a small integer ID.
+
+    Games keep the IDs and the names are only looked up when something has to
+    be shown, so that comparing, hashing and counting names are int operations.
+    IDs are only meaningful inside the process that assigned them.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        """ID of 'name', adding it to the catalogue if it's new"""
+        try:
+            return self.ids[name]
+        except KeyError:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+            return self.ids[name]
+
+    def find(self, name):
+        """ID of 'name', or -1 if it's not in the catalogue"""
+        return self.ids.get(name, -1)
+
+    def name(self, name_id):
+        return self.names[name_id]
+
+
+# the catalogue shared by every game in the process
+NAMES = NameCatalogue()
@@ -2,11 +2,27 @@
 import argparse
 import csv
 import datetime
+import difflib
+import glob
+import heapq
+import itertools
+import json
 import logging
+import mmap
+import os
+import pickle
+import re
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import bs4
 
-from game import Game
+from game import COLUMNS, Game
+from game_log import GameLog, has_log
+from game_store import GameStore
+from instrumentation import Instrumentation
+from parse_cache import ParseCache
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -14,6 +30,7 @@ logging.basicConfig(
     style="{",
     datefmt="%Y-%m-%d %H:%M:%S",
 )
+logger = logging.getLogger("nvl")
 
 
 def check_unknown(token):
@@ -27,10 +44,13 @@ def are_results_valid(results):
     """
     Validates if a volleyball game result is valid.
 
+    Args:
+        results (list[int]): sets won by each team, followed by the points of
+            each set, home and away
+
     Returns:
         bool: True if the results are valid, False otherwise
     """
-    results = [int(n) for n in results]
     # Check if we have at least the number of sets won by each team
     if len(results) < 2:
         return False
@@ -112,14 +132,66 @@ def are_results_valid(results):
     return True
 
 
+RESULT_BLOCK = re.compile(rb'<div\b[^>]*\sclass="col-12 mb-4 resultContents"')
+DIV_TAG = re.compile(rb"<(/?)div\b", re.IGNORECASE)
+
+
+def find_result_blocks(page):
+    """
+    Find the result blocks in a raw html page without parsing it.
+    Return a list of (start, end) byte offsets, one per block, from the opening
+    <div> to the end of its matching </div>
+    """
+    blocks = []
+    for match in RESULT_BLOCK.finditer(page):
+        if blocks and match.start() < blocks[-1][1]:
+            continue  # nested inside the previous block
+        depth = 0
+        for tag in DIV_TAG.finditer(page, match.start()):
+            depth += -1 if tag.group(1) else 1
+            if depth == 0:
+                blocks.append((match.start(), page.find(b">", tag.end()) + 1))
+                break
+    return blocks
+
+
 class HtmlGameParser(object):
 
-    def __init__(self):
+    BACKENDS = ["html5lib", "html.parser", "lxml"]
+
+    def __init__(self, backend="html5lib", cache_dir=None, prescan=False, stats=None):
+        """
+        backend: the bs4 tree builder used to parse the whole page. All of them
+        produce the same games; html5lib is the most lenient and the slowest.
+        cache_dir: where to keep the parsed pages between runs. No cache if None
+        prescan: only build the tree for the result blocks found by a raw scan of
+        the page, instead of the whole page
+        stats: Instrumentation for the parsing stages. Disabled if None
+        """
         self.logger = logging.getLogger(self.__class__.__name__)
+        self.backend = backend
+        self.prescan = prescan
+        self.stats = stats or Instrumentation()
+        self.cache = None
+        if cache_dir:
+            self.cache = ParseCache(
+                cache_dir,
+                are_results_valid,
+                check_unknown,
+                find_result_blocks,
+                RESULT_BLOCK,
+                DIV_TAG,
+                HtmlGameParser,
+                # the whole modules, with the helpers Game uses to build games
+                # (five_sets, to_int...) and the catalogue names are interned in
+                sys.modules["game"],
+                sys.modules["names"],
+            )
 
     def parse_games(self, raw_games):
         game_list = []
         discarded = 0
+        debug = self.logger.isEnabledFor(logging.DEBUG)
 
         for entry in raw_games:
             game = Game()
@@ -128,81 +200,164 @@ class HtmlGameParser(object):
             date = entry.attrs["data-date"]
             game.set_timestamp(f"{date}T00:00")
             game.season = self.calculate_season(game.timestamp)
-            self.logger.debug(f"Found home team: {game.home}")
-            self.logger.debug(f"Found away team: {game.away}")
-            self.logger.debug(f"Found game date: {date}")
-
-            # parse the insides of the game
-            soup = bs4.BeautifulSoup(entry.renderContents(), features="html5lib")
-            spans = soup.findAll("span")
-
-            results = []
-            for tag in spans:
-                if tag.attrs:  # skip tags with attributes
-                    continue
-                if tag.text.isnumeric():
-                    results.append(tag.text)
-                if "Referee 1" in tag.text:
-                    token = tag.text.split(":")[1].replace("(Pending)", "").strip()
-                    game.r1 = check_unknown(token)
-                    self.logger.debug(f"Found game R1: {game.r1}")
-                if "Referee 2" in tag.text:
-                    token = tag.text.split(":")[1].replace("(Pending)", "").strip()
-                    game.r2 = check_unknown(token)
-                    self.logger.debug(f"Found game R2: {game.r2}")
-                if "Venue" in tag.text:
-                    token = tag.text.split(":")[1].strip().replace(",", "")
-                    game.venue = check_unknown(token)
-                    self.logger.debug(f"Found game venue: {game.venue}")
-                if any(
-                    [
-                        keyword in tag.text
-                        for keyword in [
-                            "Division",
-                            "Super",
-                            "Playoffs",
-                            "Cup",
-                            "Shield",
+            if debug:
+                self.logger.debug(f"Found home team: {game.home}")
+                self.logger.debug(f"Found away team: {game.away}")
+                self.logger.debug(f"Found game date: {date}")
+
+            with self.stats.stage("scan"):
+                # walk the insides of the game in the tree we already have,
+                # instead of serializing and parsing the block a second time
+                spans = entry.find_all("span")
+
+                results = []
+                for tag in spans:
+                    if tag.attrs:  # skip tags with attributes
+                        continue
+                    if tag.text.isnumeric():
+                        results.append(int(tag.text))
+                    if "Referee 1" in tag.text:
+                        token = tag.text.split(":")[1].replace("(Pending)", "").strip()
+                        game.r1 = check_unknown(token)
+                        if debug:
+                            self.logger.debug(f"Found game R1: {game.r1}")
+                    if "Referee 2" in tag.text:
+                        token = tag.text.split(":")[1].replace("(Pending)", "").strip()
+                        game.r2 = check_unknown(token)
+                        if debug:
+                            self.logger.debug(f"Found game R2: {game.r2}")
+                    if "Venue" in tag.text:
+                        token = tag.text.split(":")[1].strip().replace(",", "")
+                        game.venue = check_unknown(token)
+                        if debug:
+                            self.logger.debug(f"Found game venue: {game.venue}")
+                    if any(
+                        [
+                            keyword in tag.text
+                            for keyword in [
+                                "Division",
+                                "Super",
+                                "Playoffs",
+                                "Cup",
+                                "Shield",
+                            ]
                         ]
-                    ]
-                ):
-                    game.category = self.find_category(tag.text)
-                    game.division = self.find_division(tag.text)
-                    self.logger.debug(
-                        f"Found game category: {game.division} {game.category}"
-                    )
-
-            game.set_results(results)
-            self.logger.debug(f"Found game results: {results}")
-            if not are_results_valid(results):
-                self.logger.warning(f"Invalid resutls: {game}")
+                    ):
+                        game.category = self.find_category(tag.text)
+                        game.division = self.find_division(tag.text)
+                        if debug:
+                            self.logger.debug(
+                                f"Found game category: {game.division} {game.category}"
+                            )
+
+            with self.stats.stage("validation"):
+                game.set_results(results)
+                if debug:
+                    self.logger.debug(f"Found game results: {results}")
+                valid = are_results_valid(results)
+            if not valid:
+                self.logger.warning("Invalid resutls: %s", game)
+                self.stats.count("discarded")
                 discarded += 1
                 continue
 
             game_list.append(game)
-            self.logger.info(f"Parsed results for: {game}")
+            self.stats.count("games")
+            self.logger.info("Parsed results for: %s", game)
         return game_list, discarded
 
-    def parse_files(self, filelist):
+    def parse_file(self, filename):
         """
-        Parse html files from volleyballengland.org to get the results of games.
-        Return a list of Game objects
+        Parse a single html file.
+        Return the list of valid Game objects and the number of discarded games
         """
-        total_games = []
-        invalid = 0
-        for filename in filelist:
-            self.logger.info(f"Parsing {filename}")
-            html = self.load_file(filename)
-            soup = bs4.BeautifulSoup(html, features="html5lib")
-            raw_games = soup.findAll(
+        self.stats.start_file(filename)
+        try:
+            return self._parse_file(filename)
+        finally:
+            self.stats.end_file()
+
+    def _parse_file(self, filename):
+        self.stats.count("pages")
+        with self.stats.stage("load"):
+            if self.prescan:
+                html, key = self.load_result_blocks(filename)
+            else:
+                html = self.load_file(filename)
+                key = self.cache_key(html, "full")
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.logger.info(f"Using cached results for {filename}")
+                self.stats.count("cache_hits")
+                self.stats.count("games", len(cached[0]))
+                self.stats.count("discarded", cached[1])
+                return cached
+            self.stats.count("cache_misses")
+
+        self.logger.info(f"Parsing {filename}")
+        with self.stats.stage("dom"):
+            soup = bs4.BeautifulSoup(html, features=self.backend)
+            raw_games = soup.find_all(
                 "div", attrs={"class": "col-12 mb-4 resultContents"}
             )
-            parsed_games, discarded = self.parse_games(raw_games)
-            invalid += discarded
-            total_games.extend(parsed_games)
+        parsed = self.parse_games(raw_games)
+        if self.cache:
+            self.cache.put(key, parsed)
+        return parsed
+
+    def _parse_file_in_worker(self, filename):
+        """
+        parse_file() for a pool worker: it also returns the measurements taken
+        in the worker, so they can be merged back into self.stats
+        """
+        self.stats = self.stats.fresh()
+        return self.parse_file(filename), self.stats
 
-        total = invalid + len(total_games)
-        print(f"Discarded {invalid} out of {total} games ({invalid/total*100}%)")
+    def iter_games(self, filelist, jobs=1):
+        """
+        Parse html files and yield their valid games as soon as each file is
+        done, in the order of 'filelist'. With jobs > 1 the files are spread
+        over a pool of processes.
+        The number of valid and discarded games is kept in self.valid and
+        self.discarded
+        """
+        self.valid = 0
+        self.discarded = 0
+        if jobs > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                parsed = executor.map(self._parse_file_in_worker, filelist)
+                yield from self._count(self._merge_stats(parsed))
+        else:
+            yield from self._count(map(self.parse_file, filelist))
+
+    def _count(self, parsed):
+        for parsed_games, discarded in parsed:
+            self.valid += len(parsed_games)
+            self.discarded += discarded
+            yield from parsed_games
+
+    def _merge_stats(self, parsed):
+        for result, stats in parsed:
+            self.stats.merge(stats)
+            yield result
+
+    def print_discarded(self):
+        total = self.discarded + self.valid
+        print(
+            f"Discarded {self.discarded} out of {total} games "
+            f"({self.discarded/total*100}%)"
+        )
+
+    def parse_files(self, filelist, jobs=1):
+        """
+        Parse html files from volleyballengland.org to get the results of games.
+        With jobs > 1 the files are spread over a pool of processes; the results
+        are merged back in the order of 'filelist', so the output is the same.
+        Return a list of Game objects
+        """
+        total_games = list(self.iter_games(filelist, jobs))
+        self.print_discarded()
         return total_games
 
     def load_file(self, fname):
@@ -211,6 +366,32 @@ class HtmlGameParser(object):
             text = f.read()
         return text
 
+    def cache_key(self, data, context):
+        """
+        Cache key of a page read as 'context' ("full" or "prescan") and parsed
+        with the backend, as backends may not build the same games. None
+        without a cache
+        """
+        if self.cache is None:
+            return None
+        return self.cache.key(data, context=f"{context} {self.backend}")
+
+    def load_result_blocks(self, fname):
+        """
+        Memory-map the file and cut out the result blocks, skipping the rest of
+        the page. Return the blocks as a single html string, and the cache key
+        of the whole file (None without a cache)
+        """
+        self.logger.debug(f"Scanning {fname}")
+        if not os.path.getsize(fname):  # empty files can't be mapped
+            return "", self.cache_key(b"", "prescan")
+
+        with open(fname, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as page:
+                key = self.cache_key(page, "prescan")
+                blocks = [page[start:end] for start, end in find_result_blocks(page)]
+        return b"".join(blocks).decode(), key
+
     def find_category(self, text):
         if "Women" in text:
             return "women"
@@ -252,20 +433,254 @@ class HtmlGameParser(object):
 
 
 def load_csv(filename):
+    """Games of a CSV file, with those appended to its log (see GameLog)"""
+    if has_log(filename):
+        return GameLog(filename).games()
+    with open(filename, "r", newline="") as csv_file:
+        return list(Game.read_csv(csv_file))
+
+
+def load_json(filename):
+    """Games of a JSON file, as written by past.write_json"""
+    with open(filename, "r") as f:
+        content = json.load(f)
     games = []
-    with open(filename, "r") as csv_file:
-        csv_games = csv.DictReader(csv_file)
-        for g in csv_games:
-            games.append(Game.from_csv(g))
+    for attrs in content:
+        g = Game(attrs)
+        # the timestamps were written in local time, the date and time are exact
+        if "date" in attrs:
+            g.set_timestamp(f"{attrs['date']}T{attrs.get('time', '00:00')}", True)
+        g.category = attrs.get("category")
+        g.season = attrs.get("season") or HtmlGameParser.calculate_season(g.timestamp)
+        games.append(g)
     return games
 
 
+def iter_ndjson(filename):
+    """Yield the games of an NDJSON file, one line at a time"""
+    with open(filename, "r") as f:
+        for line in f:
+            if line.strip():
+                yield Game.from_record(json.loads(line))
+
+
+def write_ndjson(games, filename):
+    """
+    Write games as newline-delimited JSON, one compact record per line, as
+    they come. Return the number of games written
+    """
+    written = 0
+    with open(filename, "w") as f:
+        for g in games:
+            f.write(json.dumps(g.to_record(), separators=(",", ":")))
+            f.write("\n")
+            written += 1
+    return written
+
+
+def read_games(filename):
+    """Games of a CSV, JSON or NDJSON (.ndjson/.jsonl) file"""
+    if filename.endswith((".ndjson", ".jsonl")):
+        return list(iter_ndjson(filename))
+    if filename.endswith(".json"):
+        return load_json(filename)
+    return load_csv(filename)
+
+
+def partition_files(
+    directory="past",
+    seasons=None,
+    divisions=None,
+    categories=None,
+    since=None,
+    until=None,
+):
+    """
+    The CSV partitions of 'directory' that can hold games of the given
+    seasons, divisions, categories and dates (ISO, inclusive). With the
+    manifest written by seasons.py, partitions are skipped by their key and
+    range of dates; without it, season_<season>.csv files are picked by name
+    """
+    manifest_file = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_file):
+        files = sorted(glob.glob(os.path.join(directory, "season_*.csv")))
+        if seasons is None:
+            return files
+        return [
+            f
+            for f in files
+            if os.path.basename(f)[len("season_") : -len(".csv")] in seasons
+        ]
+
+    with open(manifest_file, "r") as f:
+        manifest = json.load(f)
+    accepted = {"season": seasons, "division": divisions, "category": categories}[
+        manifest["key"]
+    ]
+    files = []
+    for value, p in sorted(manifest["partitions"].items()):
+        if accepted is not None and value not in accepted:
+            continue
+        if since is not None and p["last_date"] < since:
+            continue
+        if until is not None and p["first_date"] > until:
+            continue
+        files.append(os.path.join(directory, p["file"]))
+    return files
+
+
+def scan_csv(
+    files, seasons=None, divisions=None, categories=None, since=None, until=None
+):
+    """
+    Return the header of the CSV 'files' and an iterator over their rows that
+    match the filters. The rows are filtered as they are read, before any game
+    is built. All the files must have the same columns. Without files, e.g.
+    when the filters match no partition, the header is COLUMNS and there are
+    no rows
+    """
+    if not files:
+        return list(COLUMNS), iter(())
+    with open(files[0], "r", newline="") as f:
+        header = next(csv.reader(f), [])
+    filters = [
+        (header.index(column), set(accepted).__contains__)
+        for column, accepted in [
+            ("season", seasons),
+            ("division", divisions),
+            ("category", categories),
+        ]
+        if accepted is not None
+    ]
+    date = header.index("date")
+    if since is not None:
+        filters.append((date, lambda value: value >= since))
+    if until is not None:
+        filters.append((date, lambda value: value <= until))
+    return header, _filtered_rows(files, header, filters)
+
+
+def _filtered_rows(files, header, filters):
+    for filename in files:
+        if has_log(filename):
+            # the current rows, with the log folded in, in COLUMNS order
+            positions = [COLUMNS.index(c) for c in header]
+            for row in GameLog(filename).rows():
+                row = [row[i] for i in positions]
+                if all(accept(row[i]) for i, accept in filters):
+                    yield row
+            continue
+        with open(filename, "r", newline="") as f:
+            reader = csv.reader(f)
+            if next(reader, None) != header:
+                raise ValueError(f"{filename} doesn't have the columns of {files[0]}")
+            for row in reader:
+                if row and all(accept(row[i]) for i, accept in filters):
+                    yield row
+
+
+def load_games(
+    seasons=None,
+    divisions=None,
+    categories=None,
+    since=None,
+    until=None,
+    directory="past",
+):
+    """
+    Games of the partitions written by seasons.py. Only the files that can
+    match the filters are opened (see partition_files), and their rows are
+    filtered while they are read
+    """
+    filters = dict(
+        seasons=seasons,
+        divisions=divisions,
+        categories=categories,
+        since=since,
+        until=until,
+    )
+    header, rows = scan_csv(partition_files(directory, **filters), **filters)
+    return list(Game.from_rows(header, rows))
+
+
+def compare_csv(filename, golden):
+    """
+    Compare a generated CSV file against a known-good one, line by line.
+    Return the number of lines that differ
+    """
+    with open(filename, "r") as f:
+        produced = f.read().splitlines()
+    with open(golden, "r") as f:
+        expected = f.read().splitlines()
+
+    differences = 0
+    for line in difflib.unified_diff(expected, produced, golden, filename, lineterm=""):
+        if line.startswith(("+", "-")) and not line.startswith(("+++", "---")):
+            differences += 1
+        print(line)
+    return differences
+
+
+CSV_HEADER = "season,date,home,home_sets,home_points,away,away_sets,away_points,division,category,venue,r1,r2\n"
+
+
 def write_csv(games, filename):
     with open(filename, "w") as f:
-        header = "season,date,home,home_sets,home_points,away,away_sets,away_points,division,category,venue,r1,r2\n"
-        f.write(header)
+        f.write(CSV_HEADER)
+        for g in games:
+            f.write(f"{g.csv()}\n")
+
+
+def stream_csv(games, filename, chunk_size=5000):
+    """
+    Write games to a CSV file as they come, flushing every 'chunk_size' rows.
+    Rows are written in the order they are produced
+    """
+    written = 0
+    with open(filename, "w") as f:
+        f.write(CSV_HEADER)
         for g in games:
             f.write(f"{g.csv()}\n")
+            written += 1
+            if written % chunk_size == 0:
+                f.flush()
+    return written
+
+
+def write_sorted_csv(games, filename, chunk_size=5000):
+    """
+    Write games to a CSV file in sorted order, without holding them all in memory.
+    The games are consumed in chunks of 'chunk_size', each chunk is sorted and
+    spilled to a temporary file, and the spilled runs are merged into 'filename'.
+    Games are ordered by Game.sort_key, like the other writers, so the output
+    is the same whatever the chunk size.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        runs = []
+        for chunk in _chunks(games, chunk_size):
+            run = os.path.join(tmp_dir, f"run-{len(runs)}.pickle")
+            with open(run, "wb") as f:
+                for g in sorted(chunk, key=Game.sort_key):
+                    pickle.dump(g, f, protocol=pickle.HIGHEST_PROTOCOL)
+            runs.append(run)
+
+        merged = heapq.merge(*[_read_run(r) for r in runs], key=Game.sort_key)
+        return stream_csv(merged, filename, chunk_size)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _read_run(filename):
+    with open(filename, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
 
 
 # def parse_games(games, div):
@@ -322,68 +737,58 @@ def write_csv(games, filename):
 #     return game_list
 
 
-# def merge_results(database, results):
-#     """
-#     Add the results from 'results' into the corresponding game in 'database'.
-#     All games in 'results' should have a corresponding game in 'database';
-#      otherwise there must have been some update to the details (referees, time, date, etc...)
-#     """
-#     missing = []
-#     for res in results:
-#         if res not in database:
-#             logger.warning(f"Game {res} not found in database. Adding")
-#             missing.append(res)
-#             continue
-#         index = database.index(res)
-#         logger.info(f"Adding results for: {res}")
-#         database[index] += res
-#         # database[index].home_sets = res.home_sets
-#         # database[index].home_points = res.home_points
-#         # database[index].away_sets = res.away_sets
-#         # database[index].away_points = res.away_points
-#         #
-#         # if not database[index].r1:
-#         #     database[index].r1 = res.r1
-#         # if not database[index].r2:
-#         #     database[index].r2 = res.r2
-#         # if not database[index].venue:
-#         #     database[index].venue = res.venue
-#
-#     database.extend(missing)
-#     # with open("missing.json", "w") as f:
-#     #     f.write(json.dumps([g.to_dict() for g in missing], indent=2))
-#     return database
-#
-#
-# def look_for_updates(database, unplayed):
-#     for g in unplayed:
-#         index = -1
-#         if g.number:
-#             filtro = list(filter(lambda x: x.number == g.number, database))
-#         else:
-#             filtro = list(
-#                 filter(
-#                     lambda x: x.home == g.home
-#                     and x.away == g.away
-#                     and x.division == g.division,
-#                     database,
-#                 )
-#             )
-#
-#         try:
-#             index = database.index(filtro[0])
-#         except IndexError as ie:
-#             logger.error(f"No game matching number '{g.number}': {g}")
-#             database.append(g)
-#         except ValueError as ve:
-#             logger.error(f"Game not found in database: {g}")
-#             database.append(g)
-#
-#         if database[index] != g:
-#             logger.warning(f"Unmatched game {g.number}, merging")
-#             logger.debug(g)
-#             logger.debug(database[index])
-#             database[index] += g
+def merge_results(database, results):
+    """
+    Add the results from 'results' into the corresponding game in 'database'.
+    All games in 'results' should have a corresponding game in 'database';
+     otherwise there must have been some update to the details (referees, time, date, etc...)
+    Return the merged games, sorted
+    """
+    store = GameStore(database)
+    added, merged = store.upsert(results)
+    for g in added:
+        logger.warning(f"Game {g} not found in database. Adding")
+    logger.info(f"Merged {len(merged)} games, added {len(added)}")
+    return store.sorted()
+
+
+def look_for_updates(database, unplayed):
+    """
+    Merge 'unplayed' into 'database', matching games by division and teams so
+    that games which have been rescheduled replace their old date. The teams
+    may meet more than once in the division, so only the stored game with the
+    same number is taken as the one that moved (GameStore.rescheduled); other
+    games are added as new.
+    Return the updated games, sorted
+    """
+    store = GameStore(database)
+    # games still on their date: merged in one batch, with a single summary
+    stored = [g in store for g in unplayed]
+    store.upsert([g for g, found in zip(unplayed, stored) if found])
+    for g, found in zip(unplayed, stored):
+        if found:
+            continue
+        if g in store:  # given twice
+            store.add(store.get(g).merge(g))
+            continue
+        previous, fixtures = store.rescheduled(g)
+        if previous is None:
+            if fixtures:
+                logger.error(
+                    f"None of the {len(fixtures)} games of the fixture has "
+                    f"the number of {g}, adding"
+                )
+            else:
+                logger.error(f"Game not found in database: {g}")
+            store.add(g)
+            continue
+        logger.warning(f"Game {g} has moved from {previous.date()}, merging")
+        store.remove(previous)
+        merged = previous.merge(g)
+        # Game.merge leaves the number out: keep it to match the next updates
+        merged.number = g.number or previous.number
+        store.add(merged)
+    return store.sorted()
 
 
 if __name__ == "__main__":
@@ -395,14 +800,100 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("files", nargs="+", help="Files to parse")
     parser.add_argument("--dest", nargs=1, help="Where to write the parsed games")
+    parser.add_argument(
+        "--backend",
+        choices=HtmlGameParser.BACKENDS,
+        default="html5lib",
+        help="HTML parser used to build the page tree",
+    )
+    parser.add_argument(
+        "--golden",
+        help="Known-good CSV to compare the parsed games against",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the files",
+    )
+    parser.add_argument(
+        "--cache",
+        default=".parse-cache",
+        help="Directory where parsed pages are cached between runs",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every page again, ignoring the cache",
+    )
+    parser.add_argument(
+        "--prescan",
+        action="store_true",
+        help="Only parse the result blocks of each page, found by a raw scan",
+    )
+    parser.add_argument(
+        "--stats",
+        help="Write counters and timings of the parsing stages to this JSON file",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write the games while parsing, sorting them with bounded memory",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only append new or changed games to the log of --dest, see game_log.py",
+    )
+    parser.add_argument(
+        "--max-log",
+        type=int,
+        default=1000,
+        help="With --incremental, compact --dest once its log holds more games",
+    )
+    parser.add_argument(
+        "--merge-into",
+        help="CSV of games to merge the parsed games into before writing them",
+    )
     args = parser.parse_args()
 
-    game_parser = HtmlGameParser()
-    games = game_parser.parse_files(args.files)
-
-    # save games to file
-    # write_csv(sorted(games, key=lambda x: x.timestamp), args.dest[0])
-    write_csv(sorted(games), args.dest[0])
+    cache_dir = None if args.no_cache else args.cache
+    stats = Instrumentation(enabled=bool(args.stats))
+    game_parser = HtmlGameParser(
+        backend=args.backend, cache_dir=cache_dir, prescan=args.prescan, stats=stats
+    )
+    if args.stream:
+        # parsing and writing are interleaved, so they are timed together
+        with stats.stage("stream"):
+            write_sorted_csv(
+                game_parser.iter_games(args.files, jobs=args.jobs), args.dest[0]
+            )
+        game_parser.print_discarded()
+    else:
+        games = game_parser.parse_files(args.files, jobs=args.jobs)
+        if args.merge_into:
+            with stats.stage("merge"):
+                games = merge_results(load_csv(args.merge_into), games)
+
+        # save games to file
+        # write_csv(sorted(games, key=lambda x: x.timestamp), args.dest[0])
+        with stats.stage("write"):
+            if args.incremental:
+                log = GameLog(args.dest[0], max_log=args.max_log)
+                written = log.append(sorted(games, key=Game.sort_key))
+                print(f"Appended {written} new or changed games to {args.dest[0]}")
+            else:
+                write_csv(sorted(games, key=Game.sort_key), args.dest[0])
+
+    if args.stats:
+        stats.write_json(args.stats)
+
+    if args.golden:
+        mismatches = compare_csv(args.dest[0], args.golden)
+        if mismatches:
+            print(f"{mismatches} lines differ from {args.golden}")
+            sys.exit(1)
+        print(f"Output matches {args.golden}")
 
     # generate the final page
     # generator.generate_html(games)
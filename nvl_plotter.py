@@ -1,20 +1,51 @@
-import csv
+import hashlib
+import os
+import re
+import tempfile
 
-import pandas
+from plotly.offline import get_plotlyjs
 
-from game import Game
+import game_dataset
+from game import COLUMNS
+from game_db import GameDatabase
+from game_table import GameTable
+from nvl import partition_files, scan_csv
+from snapshot import SNAPSHOTS
+
+# directory of the charts of each referee
+REFEREES_DIRECTORY = "web/charts/referees"
 
 
 class NvlPlotter:
-    def __init__(self, filename: str, write_files=False):
-        self.games = []
+    def __init__(self, filename: str, write_files=False, **filters):
+        """
+        filename: CSV file, directory of partitions written by seasons.py,
+          SQLite database (.db) or Arrow dataset (directory of season=*.arrow)
+        filters: seasons, divisions and categories to load, as lists. CSV files
+          and partitions also take since/until dates, databases a referee, team
+          and venue (see GameDatabase.select)
+        """
         self.publish = write_files
-        with open(filename, "r") as csv_file:
-            csv_games = csv.DictReader(csv_file)
-            for g in csv_games:
-                self.games.append(Game.from_csv(g))
-
-        self.dataframe = pandas.read_csv(filename)
+        self.filename = filename
+        self.filters = filters
+        # the one load of the data: games and DataFrame are views of it
+        if os.path.isdir(filename) and partition_files(filename):
+            self.table = self._load_csv(partition_files(filename, **filters), **filters)
+        elif os.path.isdir(filename):
+            dataset = game_dataset.read_dataset(filename, **filters)
+            self.table = GameTable.from_arrow(dataset)
+        elif filename.endswith(".db"):
+            if not os.path.exists(filename):
+                # sqlite3 would create it, and every chart would be empty
+                raise FileNotFoundError(f"No such database: {filename}")
+            db = GameDatabase(filename)
+            self.table = GameTable.from_rows(COLUMNS, db.select(**filters))
+            db.close()
+        elif filters:
+            self.table = self._load_csv([filename], **filters)
+        else:
+            # shared with every plotter of the same file, and cached on disk
+            self.table = SNAPSHOTS.load(filename, GameTable.from_csv)
 
         self.referee_subset = [
             # "Aileen Barry",
@@ -40,3 +71,56 @@ class NvlPlotter:
             # "Timothy Hebborn",
             # "William Perugini",
         ]
+
+    @property
+    def games(self):
+        """Game objects of the table, built on first use"""
+        return self.table.games()
+
+    @property
+    def dataframe(self):
+        """DataFrame of the table, built on first use"""
+        return self.table.dataframe()
+
+    @staticmethod
+    def referee_directory(referee):
+        """
+        Directory of the charts of 'referee': the name, with what can't be in a
+        path replaced, plus a hash of the name itself, as different names can
+        be the same once replaced (e.g. "A.B" and "A B")
+        """
+        digest = hashlib.sha1(referee.encode()).hexdigest()[:8]
+        slug = re.sub(r"[^\w-]+", "_", referee)
+        return os.path.join(REFEREES_DIRECTORY, f"{slug}-{digest}")
+
+    @classmethod
+    def write_html(cls, fig, chart, referee=None):
+        """
+        Write 'fig' to web/charts/<chart>.html or, for the charts of a single
+        referee, to <referee_directory>/<chart>.html. Referee charts
+        share one copy of plotly.js, in web/charts/referees/, instead of each
+        embedding its own
+        """
+        if referee is None:
+            fig.write_html(f"web/charts/{chart}.html")
+            return
+        plotlyjs = os.path.join(REFEREES_DIRECTORY, "plotly.min.js")
+        if not os.path.exists(plotlyjs):
+            os.makedirs(REFEREES_DIRECTORY, exist_ok=True)
+            # pool workers may race to write it: only whole files get in place
+            fd, temp = tempfile.mkstemp(dir=REFEREES_DIRECTORY, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(get_plotlyjs())
+            os.replace(temp, plotlyjs)
+        directory = cls.referee_directory(referee)
+        os.makedirs(directory, exist_ok=True)
+        fig.write_html(
+            os.path.join(directory, f"{chart}.html"),
+            include_plotlyjs="../plotly.min.js",
+        )
+
+    @staticmethod
+    def _load_csv(files, **filters):
+        """Table of the rows of CSV 'files' that match 'filters', see nvl.scan_csv"""
+        header, rows = scan_csv(files, **filters)
+        return GameTable.from_rows(header, rows)
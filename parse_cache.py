@@ -0,0 +1,76 @@
+import hashlib
+import inspect
+import logging
+import os
+import pickle
+import tempfile
+
+# bump this when the parsing changes in a way the source fingerprint can't see
+PARSER_VERSION = "1"
+
+
+class ParseCache(object):
+    """
+    Persistent cache of parsed pages, keyed by the content of the page.
+
+    Every entry is a pickle file named after the hash of the page contents, the
+    parser version and the source code of the functions the parsed result
+    depends on, so editing any of those invalidates the whole cache on its own.
+    """
+
+    def __init__(self, directory, *dependencies):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = directory
+        self.fingerprint = self.calculate_fingerprint(dependencies)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def calculate_fingerprint(dependencies):
+        digest = hashlib.sha256(PARSER_VERSION.encode())
+        for d in dependencies:
+            try:
+                source = inspect.getsource(d)
+            except TypeError:
+                # not code, e.g. a compiled pattern: its repr shows what it does
+                source = repr(d)
+            digest.update(source.encode())
+        return digest.hexdigest()
+
+    def key(self, content, context=""):
+        """
+        content: the raw page, as text or bytes
+        context: anything else that changes the parsed result, e.g. the filename
+        """
+        if isinstance(content, str):
+            content = content.encode()
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(context.encode())
+        digest.update(content)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (EOFError, pickle.UnpicklingError) as e:
+            self.logger.warning(f"Ignoring corrupted cache entry {key}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        # write to a temporary file first, so that concurrent workers
+        # never see a half-written entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path(key))
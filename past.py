@@ -8,6 +8,7 @@ import bs4
 
 import generator
 from game import Game, DIVISIONS
+from parse_cache import ParseCache
 import logging
 
 logging.basicConfig(
@@ -93,6 +94,14 @@ def parse_results(games, div, cat, season):
 
 if __name__ == "__main__":
     games = []
+    cache = ParseCache(
+        ".parse-cache",
+        parse_results,
+        # the whole modules, with the helpers Game uses to build games and the
+        # catalogue names are interned in
+        sys.modules["game"],
+        sys.modules["names"],
+    )
     seasons = set()
     categories = set()
     divisions = [
@@ -130,11 +139,20 @@ if __name__ == "__main__":
         else:
             logger.info(f"  CAT: {category} DIV: {division} YEAR: {season}")
 
-        # parse the played games to get results
+        # parse the played games to get results, unless the page hasn't changed
         html = load_file(filename)
-        soup = bs4.BeautifulSoup(html, features="html.parser")
-        raw_games = soup.findAll("div", attrs={"class": "col-12 mb-4 resultContents"})
-        games.extend(parse_results(raw_games, division, category, season))
+        key = cache.key(html, f"{division} {category} {season}")
+        parsed = cache.get(key)
+        if parsed is None:
+            soup = bs4.BeautifulSoup(html, features="html.parser")
+            raw_games = soup.findAll(
+                "div", attrs={"class": "col-12 mb-4 resultContents"}
+            )
+            parsed = parse_results(raw_games, division, category, season)
+            cache.put(key, parsed)
+        games.extend(parsed)
+
+    print(f"Cache: {cache.hits} hits, {cache.misses} misses")
 
     # save games to file
     write_csv(games)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Reconcile scraped results with the stored fixtures in one batch:
+
+    ./reconcile.py unplayed.json results.json --dest nvl.csv --report diff.json
+
+Games are joined by (division, date, home, away), or by fixture and number
+for the ones that were rescheduled, and merged quietly. Instead of printing every merge,
+the differences between both sides are written as a single JSON report.
+"""
+
+import argparse
+import json
+
+from game_store import GameStore
+from nvl import read_games, write_csv
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("fixtures", help="CSV or JSON of the stored games")
+    parser.add_argument("results", nargs="+", help="CSV or JSON of new results")
+    parser.add_argument("--dest", help="Where to write the reconciled games")
+    parser.add_argument("--report", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    store = GameStore(read_games(args.fixtures))
+    fixtures = len(store)
+    results = []
+    for filename in args.results:
+        results.extend(read_games(filename))
+
+    report = store.reconcile(results)
+    report = dict(fixtures=fixtures, results=len(results), **report)
+
+    print(
+        f"{report['merged']} games merged ({len(report['moved'])} rescheduled), "
+        f"{len(report['added'])} added, {len(report['ambiguous'])} ambiguous, "
+        f"{len(report['conflicts'])} conflicts"
+    )
+    for field, count in report["conflicts_per_field"].items():
+        print(f"{field:>12}: {count}")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            # timestamps and points are written as text
+            f.write(json.dumps(report, indent=2, default=str))
+    if args.dest:
+        write_csv(store.sorted(), args.dest)
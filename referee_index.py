@@ -0,0 +1,62 @@
+import numpy
+
+from names import NAMES
+
+# roles of a referee in a game
+R1 = 0
+R2 = 1
+
+
+class RefereeIndex(object):
+    """
+    The games of every referee of a GameTable, and the role they had in each,
+    found once for all of them with a single sort of the appointments.
+
+    Looking up a referee then costs as much as their own games, instead of a
+    scan of the whole table:
+
+        index = RefereeIndex(table)
+        games = index.select("Richard Parkes")  # a GameTable
+        as_r1, as_r2, both = index.roles("Richard Parkes")
+    """
+
+    def __init__(self, table):
+        self.table = table
+        # appointments: R1 then R2 of each game, grouped by referee and, as
+        # the sort is stable, in the order of the games within each referee
+        referee = numpy.stack([table.r1, table.r2], axis=1).ravel()
+        order = numpy.argsort(referee, kind="stable")
+        self._rows = (order // 2).astype(numpy.int32)
+        self._roles = (order % 2).astype(numpy.int8)
+        ids, starts = numpy.unique(referee[order], return_index=True)
+        ends = numpy.append(starts[1:], len(order))
+        self.spans = dict(zip(ids.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def __contains__(self, name):
+        return NAMES.find(name) in self.spans
+
+    def names(self):
+        """Names of the referees, sorted, leaving out missing and "unknown" ones"""
+        missing = {None, "", "unknown"}
+        return sorted(
+            NAMES.names[i] for i in self.spans if NAMES.names[i] not in missing
+        )
+
+    def _span(self, name):
+        return self.spans.get(NAMES.find(name), (0, 0))
+
+    def rows(self, name):
+        """Rows of the table of the games of referee 'name', in order"""
+        start, end = self._span(name)
+        return numpy.unique(self._rows[start:end])
+
+    def roles(self, name):
+        """Number of games of 'name' as R1, as R2 and as both"""
+        start, end = self._span(name)
+        as_r1 = int((self._roles[start:end] == R1).sum())
+        both = (end - start) - len(self.rows(name))
+        return as_r1, end - start - as_r1, both
+
+    def select(self, name):
+        """A GameTable of the games of referee 'name'"""
+        return self.table.select(self.rows(name))
@@ -7,6 +7,7 @@ import pandas
 from plotly import express as px
 
 from history_plotter import HistoryPlotter
+from names import NAMES
 from nvl import HtmlGameParser
 
 
@@ -510,7 +511,7 @@ class SeasonPlotter(HistoryPlotter):
 
     def generate_community_graph(self):
         # Extract edges between Home and Away teams
-        edges = list(zip(self.dataframe["Home"], self.dataframe["Away"]))
+        edges = list(zip(self.dataframe["home"], self.dataframe["away"]))
 
         # Create a graph from the edge list
         g = ig.Graph.TupleList(edges, directed=False)
@@ -549,7 +550,7 @@ class SeasonPlotter(HistoryPlotter):
     def generate_connected_components_graph(self):
         # Extract edges between Home and Away teams
         good_edges = []
-        edges = list(zip(self.dataframe["R1"], self.dataframe["R2"]))
+        edges = list(zip(self.dataframe["r1"], self.dataframe["r2"]))
         print(len(edges))
 
         bad = ["TBC", 119979, 116921, 119791, "119979", "116921", "119791"]
@@ -633,21 +634,21 @@ class SeasonPlotter(HistoryPlotter):
         """Show the number of different temas each ref has refereed"""
         teams = {}
         for g in self.games:
-            if g.r1 not in teams:
-                teams[g.r1] = set()
-            if g.r2 not in teams:
-                teams[g.r2] = set()
-            teams[g.r1].add(g.home)
-            teams[g.r1].add(g.away)
-            teams[g.r2].add(g.home)
-            teams[g.r2].add(g.away)
+            if g.r1_id not in teams:
+                teams[g.r1_id] = set()
+            if g.r2_id not in teams:
+                teams[g.r2_id] = set()
+            teams[g.r1_id].add(g.home_id)
+            teams[g.r1_id].add(g.away_id)
+            teams[g.r2_id].add(g.home_id)
+            teams[g.r2_id].add(g.away_id)
 
         referees = []
         values = []
         for r in teams:
-            if not r:
+            if not NAMES.names[r]:
                 continue
-            referees.append(r)
+            referees.append(NAMES.names[r])
             values.append(len(teams[r]))
 
         df = pandas.DataFrame(dict(referees=referees, count=values))
@@ -677,23 +678,23 @@ class SeasonPlotter(HistoryPlotter):
         teams = {}
         total_games = Counter()
         for g in self.games:
-            if g.r1 not in teams:
-                teams[g.r1] = set()
-            if g.r2 not in teams:
-                teams[g.r2] = set()
-            teams[g.r1].add(g.home)
-            teams[g.r1].add(g.away)
-            teams[g.r2].add(g.home)
-            teams[g.r2].add(g.away)
-            total_games[g.r1] += 1
-            total_games[g.r2] += 1
+            if g.r1_id not in teams:
+                teams[g.r1_id] = set()
+            if g.r2_id not in teams:
+                teams[g.r2_id] = set()
+            teams[g.r1_id].add(g.home_id)
+            teams[g.r1_id].add(g.away_id)
+            teams[g.r2_id].add(g.home_id)
+            teams[g.r2_id].add(g.away_id)
+            total_games[g.r1_id] += 1
+            total_games[g.r2_id] += 1
 
         referees = []
         indices = []
         for r in teams:
-            if not r:
+            if not NAMES.names[r]:
                 continue
-            referees.append(r)
+            referees.append(NAMES.names[r])
             indices.append(len(teams[r]) / total_games[r])
 
         df = pandas.DataFrame(dict(referees=referees, indices=indices))
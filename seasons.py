@@ -1,22 +1,100 @@
+#!/usr/bin/env python3
+"""
+Split a CSV of games into one file per season (or division, or category):
+
+    ./seasons.py past.csv --dest past
+    ./seasons.py past.csv --dest past-by-division --key division
+
+The source is read once, each row is streamed to a temporary file of its
+partition, and every partition is then sorted by date on its own. A
+manifest.json next to them records, for each partition, its file, number of
+rows and range of dates, so that loaders can skip the partitions they don't
+need.
+"""
+
+import argparse
 import csv
-import sys
-
-with open("past.csv", "r") as csv_file:
-    total_games = csv.DictReader(csv_file)
-    all_games = list(total_games)
-
-    year = 2005
-    while year < 2025:
-        season = f"{year}-{year + 1}"
-        games = list(filter(lambda g: g["season"] == season, all_games))
-
-        with open(f"season_{season}.csv", "w") as dest_file:
-            header = "season,date,time,ID,home,home_sets,home_points,away,away_sets,away_points,division,category,venue,r1,r2".split(
-                ","
-            )
-            writer = csv.DictWriter(dest_file, header)
-            writer.writeheader()
-            sorted_games = sorted(games, key=lambda y: y["date"])
-            writer.writerows(games)
-
-        year += 1
+import json
+import os
+
+KEYS = ["season", "division", "category"]
+MANIFEST = "manifest.json"
+
+
+def partition_filename(key, value):
+    # values like "Division 1 Men" are fine in a filename, separators aren't
+    return f"{key}_{value.replace(os.sep, '-')}.csv"
+
+
+def partition(source, directory, key="season"):
+    """
+    Write the rows of 'source' to one CSV per value of 'key' in 'directory',
+    sorted by date and time, plus the manifest. Return the manifest.
+
+    Rows are streamed to a temporary file per partition as they are read, so
+    only one partition at a time is held in memory, while it is sorted
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    writers = {}
+    try:
+        with open(source, "r", newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            column = header.index(key)
+            for row in reader:
+                if not row:
+                    continue
+                value = row[column]
+                if value not in writers:
+                    filename = partition_filename(key, value)
+                    files[value] = open(
+                        os.path.join(directory, f"{filename}.tmp"), "w", newline=""
+                    )
+                    writers[value] = csv.writer(files[value], lineterminator="\n")
+                writers[value].writerow(row)
+    finally:
+        for f in files.values():
+            f.close()
+
+    date = header.index("date")
+    time = header.index("time") if "time" in header else None
+
+    def when(row):
+        return (row[date], row[time] if time is not None else "")
+
+    manifest = {"source": source, "key": key, "columns": header, "partitions": {}}
+    for value in sorted(files):
+        filename = partition_filename(key, value)
+        path = os.path.join(directory, filename)
+        with open(f"{path}.tmp", "r", newline="") as f:
+            rows = sorted(csv.reader(f), key=when)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(header)
+            writer.writerows(rows)
+        os.remove(f"{path}.tmp")
+        manifest["partitions"][value] = {
+            "file": filename,
+            "rows": len(rows),
+            "first_date": rows[0][date],
+            "last_date": rows[-1][date],
+        }
+
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        f.write(json.dumps(manifest, indent=2))
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", nargs="?", default="past.csv", help="CSV of games")
+    parser.add_argument("--dest", default="past", help="Directory of the partitions")
+    parser.add_argument("--key", choices=KEYS, default="season")
+    args = parser.parse_args()
+
+    manifest = partition(args.source, args.dest, args.key)
+    for value, p in manifest["partitions"].items():
+        print(
+            f"{p['file']:>40}: {p['rows']:5} games, {p['first_date']} to {p['last_date']}"
+        )
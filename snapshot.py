@@ -0,0 +1,86 @@
+import logging
+import sys
+
+import numpy
+
+from game_log import has_log
+from game_table import CATEGORICAL, GameTable
+from names import NAMES
+from parse_cache import ParseCache
+
+
+class SnapshotCache(object):
+    """
+    Binary snapshots of loaded CSV files, as GameTables.
+
+    Snapshots are stored in a ParseCache, keyed by the hash of the file, and
+    hold the table columns as NumPy arrays, with names as indexes into their
+    own list, so that restoring one is mostly array copies. Loads are also
+    kept in memory, so every plotter built from the same file in a process
+    shares one instance.
+    """
+
+    def __init__(self, directory=".snapshot-cache"):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = directory
+        self.cache = None  # created on first use
+        self.loaded = {}  # key -> table
+
+    def load(self, filename, loader):
+        """
+        GameTable of 'filename'. 'loader' is called with the filename on a
+        miss and returns the table
+        """
+        if self.cache is None:
+            self.cache = ParseCache(
+                self.directory,
+                sys.modules["game"],
+                sys.modules["names"],
+                GameTable,
+                SnapshotCache,
+            )
+        with open(filename, "rb") as f:
+            data = f.read()
+        if has_log(filename):
+            # games appended to the file since it was last compacted
+            with open(f"{filename}.log", "rb") as f:
+                data += b"\0" + f.read()
+        key = self.cache.key(data, context="snapshot")
+        if key in self.loaded:
+            return self.loaded[key]
+
+        stored = self.cache.get(key)
+        if stored is None:
+            self.logger.info(f"No snapshot of {filename}, loading it")
+            table = loader(filename)
+            self.cache.put(key, self.dump(table))
+        else:
+            table = self.restore(stored)
+        self.loaded[key] = table
+        return table
+
+    @staticmethod
+    def dump(table):
+        columns = dict(table.columns)
+        # name IDs only mean something in this process: store indexes into
+        # the list of the names used instead
+        used = numpy.unique(numpy.concatenate([columns[c] for c in CATEGORICAL]))
+        for column in CATEGORICAL:
+            columns[column] = numpy.searchsorted(used, columns[column]).astype(
+                numpy.int32
+            )
+        return {"names": [NAMES.names[i] for i in used], "columns": columns}
+
+    @staticmethod
+    def restore(stored):
+        ids = numpy.array(
+            [NAMES.id(name) for name in stored["names"]], dtype=numpy.int32
+        )
+        columns = dict(stored["columns"])
+        for column in CATEGORICAL:
+            columns[column] = ids[columns[column]]
+        return GameTable(columns)
+
+
+# shared by every plotter of the process
+SNAPSHOTS = SnapshotCache()